@@ -0,0 +1,377 @@
+import asyncio, os, sys, time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from paho.mqtt import client as mqtt_client
+from backends import create_backend
+from sessionkey import reserve_nonce, session_nonce_path
+from config import (broker, port, topic, qos, publish_timeout, batch_max_items, backend, cipher, key, iv,
+                    subscriber_client_id, publisher_client_id)
+from config import max_inflight as mqtt_max_inflight, local_broker, mqtt_protocol, subscription, keystore
+from keystore import device_from_topic
+from readings import ReadingError, parse_batch, encode_reading, describe_reading, split_readings
+
+try:
+    from aiohttp import web
+except ImportError:  # aiohttp hanya dibutuhkan untuk endpoint HTTP
+    web = None
+
+# =======================
+#  Asyncio MQTT Section
+# =======================
+# Socket paho didaftarkan ke event loop (add_reader/add_writer), jadi
+# publish dan subscribe berjalan di loop yang sama tanpa thread paho.
+class _AsyncioHelper:
+    def __init__(self, loop, client):
+        self.loop = loop
+        self.client = client
+        self.misc = None
+        client.on_socket_open = self.on_socket_open
+        client.on_socket_close = self.on_socket_close
+        client.on_socket_register_write = self.on_socket_register_write
+        client.on_socket_unregister_write = self.on_socket_unregister_write
+
+    def on_socket_open(self, client, userdata, sock):
+        self.loop.add_reader(sock, client.loop_read)
+        self.misc = self.loop.create_task(self.misc_loop())
+
+    def on_socket_close(self, client, userdata, sock):
+        self.loop.remove_reader(sock)
+        if self.misc is not None:
+            self.misc.cancel()
+
+    def on_socket_register_write(self, client, userdata, sock):
+        self.loop.add_writer(sock, client.loop_write)
+
+    def on_socket_unregister_write(self, client, userdata, sock):
+        self.loop.remove_writer(sock)
+
+    async def misc_loop(self):
+        # Keepalive/PINGREQ dan retry pesan QoS
+        while self.client.loop_misc() == mqtt_client.MQTT_ERR_SUCCESS:
+            await asyncio.sleep(1)
+
+class AsyncMQTTClient:
+    def __init__(self, broker, port, client_id, max_inflight=1000, queue_size=10000):
+        self.broker = broker
+        self.port = port
+        self.client_id = client_id
+        self.client = mqtt_client.Client(client_id=client_id, protocol=mqtt_protocol)
+        self.client.max_inflight_messages_set(max_inflight)
+        self.client.max_queued_messages_set(0)
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_publish = self._on_publish
+        self.client.on_message = self._on_message
+        self.messages = asyncio.Queue(queue_size)
+        self.subscriptions = []
+        self.reconnects = 0
+        self.dropped = 0
+        self._acks = {}
+        self._connected = asyncio.Event()
+        self._loop = None
+        self._closing = False
+
+    async def connect(self):
+        self._loop = asyncio.get_running_loop()
+        _AsyncioHelper(self._loop, self.client)
+        self.client.connect(self.broker, self.port, keepalive=60)
+        await self._connected.wait()
+        return self
+
+    # properties hanya dikirim paho untuk MQTT v5
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
+        if rc != 0:
+            print(f"❌ {self.client_id} gagal koneksi, kode: {rc}")
+            return
+        for sub in self.subscriptions:
+            client.subscribe(sub, qos)
+        self._connected.set()
+
+    def _on_disconnect(self, client, userdata, rc, properties=None):
+        self._connected.clear()
+        if not self._closing:
+            print(f"⚠️ {self.client_id} terputus (kode {rc}), mencoba reconnect...")
+            self._loop.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        delay = 1
+        while not self._closing:
+            await asyncio.sleep(delay)
+            try:
+                self.client.reconnect()
+                self.reconnects += 1
+                return
+            except OSError:
+                delay = min(delay * 2, 30)
+
+    def _on_publish(self, client, userdata, mid):
+        future = self._acks.pop(mid, None)
+        if future is not None and not future.done():
+            future.set_result(mid)
+
+    def _on_message(self, client, userdata, msg):
+        try:
+            self.messages.put_nowait(msg)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def subscribe(self, topic):
+        self.subscriptions.append(topic)
+        if self._connected.is_set():
+            self.client.subscribe(topic, qos)
+
+    async def publish(self, topic, payload, qos=qos, timeout=publish_timeout):
+        await asyncio.wait_for(self._connected.wait(), timeout)
+        info = self.client.publish(topic, payload, qos)
+        if info.rc not in (mqtt_client.MQTT_ERR_SUCCESS, mqtt_client.MQTT_ERR_NO_CONN):
+            raise ConnectionError(mqtt_client.error_string(info.rc))
+        if qos == 0 or info.is_published():
+            return info
+        future = self._loop.create_future()
+        self._acks[info.mid] = future
+        try:
+            await asyncio.wait_for(future, timeout)
+        finally:
+            self._acks.pop(info.mid, None)
+        return info
+
+    async def disconnect(self):
+        self._closing = True
+        self.client.disconnect()
+
+# =======================
+#  Cipher Executor Section
+# =======================
+# Enkripsi/dekripsi tidak pernah jalan di event loop. Default thread
+# pool; CIPHER_EXECUTOR=process memakai proses terpisah (lepas dari GIL)
+# dengan backend yang dibuat sekali per worker saat start.
+_worker_backend = None
+
+def _init_cipher_worker(cipher, key, iv, engine, mode, segment_size, wire, nonce_path):
+    global _worker_backend
+    # Nonce CTR tiap worker dari counter key sesi, tidak bentrok dengan proses lain
+    _worker_backend = create_backend(cipher, key, iv, engine=engine, mode=mode, segment_size=segment_size,
+                                     wire=wire, nonce=reserve_nonce(nonce_path) if mode == 'ctr' else None).start()
+
+def _encrypt_in_worker(plaintext: str):
+    return _worker_backend.encrypt_message(plaintext)
+
+def _decrypt_in_worker(payload) -> list:
+    return split_readings(_worker_backend.decrypt_payload(payload))
+
+def _decrypt_readings(payload) -> list:
+    return split_readings(backend.decrypt_payload(payload))
+
+def _decrypt_device_readings(msg_topic, payload) -> list:
+    # Key store: key dari segmen terakhir topik; selalu di proses ini karena
+    # koneksi SQLite key store tidak ikut ke worker proses
+    return split_readings(keystore.backend(device_from_topic(msg_topic)).decrypt_payload(payload))
+
+def _encrypt_many_in_worker(plaintexts: list) -> list:
+    return _worker_backend.encrypt_many(plaintexts)
+
+def make_cipher_executor(kind=None, workers=None):
+    kind = kind or os.environ.get('CIPHER_EXECUTOR', 'thread')
+    workers = workers or int(os.environ.get('CIPHER_WORKERS', os.cpu_count() or 1))
+    if kind == 'process':
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_cipher_worker,
+            initargs=(cipher, key, iv, backend.engine.name, backend.mode, backend.segment_size, backend.wire,
+                      session_nonce_path()),
+        )
+        return executor, _encrypt_in_worker, _decrypt_in_worker, _encrypt_many_in_worker
+    executor = ThreadPoolExecutor(max_workers=workers)
+    return executor, backend.encrypt_message, _decrypt_readings, backend.encrypt_many
+
+# =======================
+#  Runtime Section
+# =======================
+class AsyncRuntime:
+    def __init__(self, max_inflight=None, subscriber_tasks=None, log_messages=None):
+        self.max_inflight = max_inflight or mqtt_max_inflight
+        self.subscriber_tasks = subscriber_tasks or int(os.environ.get('AIO_SUBSCRIBER_TASKS', 8))
+        if log_messages is None:
+            log_messages = os.environ.get('AIO_LOG_MESSAGES', '0') == '1'
+        self.log_messages = log_messages
+        self.executor, self.encrypt_fn, self.decrypt_fn, self.encrypt_many_fn = make_cipher_executor()
+        # Pesan per perangkat: thread pool cipher, atau thread pool default loop bila executor-nya proses
+        self.device_executor = self.executor if isinstance(self.executor, ThreadPoolExecutor) else None
+        self.publisher = AsyncMQTTClient(broker, port, f"{publisher_client_id}-aio-{os.getpid()}", self.max_inflight)
+        self.subscriber = AsyncMQTTClient(broker, port, f"{subscriber_client_id}-aio-{os.getpid()}")
+        self.inflight = None
+        self.published = 0
+        self.publish_failures = 0
+        self.decrypted = 0
+        self.decrypt_failures = 0
+        self._tasks = []
+
+    async def start(self, subscribe=True):
+        self.inflight = asyncio.Semaphore(self.max_inflight)
+        await self.publisher.connect()
+        print(f"✅ Publisher asyncio terhubung ke {broker}:{port}")
+        if subscribe:
+            await self.subscriber.subscribe(subscription)
+            await self.subscriber.connect()
+            print(f"📡 Menunggu data terenkripsi dari topik '{subscription}'...")
+            self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.subscriber_tasks)]
+        return self
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await self.publisher.disconnect()
+        await self.subscriber.disconnect()
+        self.executor.shutdown(wait=False)
+
+    async def publish_reading(self, suhu_str: str):
+        # Semaphore membatasi jumlah publish yang sedang menunggu ACK
+        loop = asyncio.get_running_loop()
+        async with self.inflight:
+            encrypted = await loop.run_in_executor(self.executor, self.encrypt_fn, suhu_str)
+            try:
+                await self.publisher.publish(topic, encrypted)
+            except (asyncio.TimeoutError, ConnectionError):
+                self.publish_failures += 1
+                raise
+            self.published += 1
+        return encrypted
+
+    async def _publish_encrypted(self, encrypted):
+        async with self.inflight:
+            try:
+                await self.publisher.publish(topic, encrypted)
+            except (asyncio.TimeoutError, ConnectionError):
+                self.publish_failures += 1
+                raise
+            self.published += 1
+
+    async def publish_batch(self, plaintexts):
+        # Satu kali enkripsi untuk seluruh batch, lalu semua publish jalan
+        # bersamaan (dibatasi semaphore inflight). Hasil: None atau pesan error.
+        loop = asyncio.get_running_loop()
+        encrypted = await loop.run_in_executor(self.executor, self.encrypt_many_fn, plaintexts)
+        outcomes = await asyncio.gather(*(self._publish_encrypted(e) for e in encrypted), return_exceptions=True)
+        return [None if outcome is None else (str(outcome) or "Tidak ada ACK dari broker sebelum batas waktu")
+                for outcome in outcomes]
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            msg = await self.subscriber.messages.get()
+            try:
+                if keystore is not None and msg.topic != topic:
+                    readings = await loop.run_in_executor(self.device_executor, _decrypt_device_readings,
+                                                          msg.topic, msg.payload)
+                else:
+                    readings = await loop.run_in_executor(self.executor, self.decrypt_fn, msg.payload)
+                self.decrypted += len(readings)
+                if self.log_messages:
+                    for decrypted in readings:
+                        print(f"🔓 Data didekripsi: {describe_reading(decrypted)} ← dari topik '{msg.topic}'")
+            except Exception as e:
+                self.decrypt_failures += 1
+                print(f"⚠️ Gagal mendekripsi: {e}")
+
+    def stats(self):
+        return {
+            "published": self.published,
+            "publish_failures": self.publish_failures,
+            "decrypted": self.decrypted,
+            "decrypt_failures": self.decrypt_failures,
+            "subscriber_queue": self.subscriber.messages.qsize(),
+            "subscriber_dropped": self.subscriber.dropped,
+            "reconnects": self.publisher.reconnects + self.subscriber.reconnects,
+        }
+
+# --- Endpoint HTTP (aiohttp) ---
+def create_web_app(runtime: AsyncRuntime):
+    if web is None:
+        raise RuntimeError("Runtime asyncio membutuhkan aiohttp (pip install aiohttp)")
+
+    async def send_suhu(request):
+        if request.content_type == 'application/json':
+            suhu = (await request.json()).get('suhu')
+        else:
+            suhu = (await request.post()).get('suhu')
+        if not suhu:
+            return web.json_response({"error": "Masukkan suhu"}, status=400)
+        try:
+            suhu_str = str(float(suhu))
+        except ValueError:
+            return web.json_response({"error": "Format suhu tidak valid"}, status=400)
+
+        try:
+            await runtime.publish_reading(suhu_str)
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            return web.json_response({"error": f"Gagal mengirim suhu: {e}"}, status=500)
+        return web.json_response({"status": "ok", "suhu": suhu_str, "topic": topic})
+
+    async def send_batch(request):
+        try:
+            body = await request.json()
+        except ValueError:
+            body = None
+        try:
+            readings, results = parse_batch(body, batch_max_items)
+        except ReadingError as e:
+            return web.json_response({"error": str(e)}, status=400)
+
+        # Runtime asyncio hanya mempublish ke topik dasar: pembacaan dengan site ditolak
+        for index, reading in readings:
+            if 'site' in reading:
+                results[index].update(status='error', error="site belum didukung runtime asyncio")
+        readings = [(index, r) for index, r in readings if 'site' not in r]
+        errors = await runtime.publish_batch([encode_reading(r) for _, r in readings])
+        for (index, _), error in zip(readings, errors):
+            results[index]['status'] = 'ok' if error is None else 'error'
+            if error is not None:
+                results[index]['error'] = error
+        published = sum(1 for r in results if r['status'] == 'ok')
+        failed = len(results) - published
+        body = {"topic": topic, "total": len(results), "published": published, "failed": failed, "results": results}
+        return web.json_response(body, status=200 if failed == 0 else 207)
+
+    async def stats(request):
+        return web.json_response(dict(backend.stats(), runtime=runtime.stats(),
+                                      local_broker=local_broker.stats() if local_broker is not None else None))
+
+    app = web.Application()
+    app.router.add_post('/send', send_suhu)
+    app.router.add_post('/send/batch', send_batch)
+    app.router.add_get('/stats', stats)
+    return app
+
+async def serve(host='127.0.0.1', http_port=5000):
+    runtime = await AsyncRuntime().start()
+    runner = web.AppRunner(create_web_app(runtime))
+    await runner.setup()
+    await web.TCPSite(runner, host, http_port).start()
+    print(f"🚀 Runtime asyncio dengan {backend.label} siap di http://{host}:{http_port}")
+    try:
+        while True:
+            await asyncio.sleep(5)
+            print(f"📊 {runtime.stats()}")
+    finally:
+        await runner.cleanup()
+        await runtime.stop()
+
+async def load_test(count: int):
+    # Publish langsung lewat jalur asyncio (tanpa HTTP) dan tunggu semua terdekripsi
+    runtime = await AsyncRuntime().start()
+    readings = [f"{20 + i % 150 / 10:.1f}" for i in range(count)]
+    start = time.perf_counter()
+    await asyncio.gather(*(runtime.publish_reading(r) for r in readings))
+    published_s = time.perf_counter() - start
+    while runtime.decrypted + runtime.decrypt_failures < count and time.perf_counter() - start < 60:
+        await asyncio.sleep(0.01)
+    total_s = time.perf_counter() - start
+    print(f"📤 {count} pesan dipublish dalam {published_s:.2f} s ({count / published_s:.0f} msgs/s)")
+    print(f"📥 {runtime.decrypted} pesan didekripsi dalam {total_s:.2f} s ({runtime.decrypted / total_s:.0f} msgs/s)")
+    print(f"📊 {runtime.stats()}")
+    await runtime.stop()
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--load':
+        asyncio.run(load_test(int(sys.argv[2])))
+    else:
+        asyncio.run(serve(os.environ.get('HTTP_HOST', '127.0.0.1'), int(os.environ.get('HTTP_PORT', 5000))))
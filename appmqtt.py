@@ -1,61 +1,96 @@
 from flask import Flask, request, jsonify, render_template_string
-import threading, time, os, base64
-from Crypto.Cipher import DES3
-from Crypto.Random import get_random_bytes
+import threading, time, os
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from paho.mqtt import client as mqtt_client
-
-# =======================
-#  3DES Utility Section
-# =======================
-def generate_key_iv():
-    key = DES3.adjust_key_parity(get_random_bytes(24))  # 3DES needs 24-byte key
-    iv = get_random_bytes(8)  # 64-bit IV
-    return key, iv
-
-def encrypt_3des_cfb(plaintext, key, iv):
-    cipher = DES3.new(key, DES3.MODE_CFB, iv)
-    ciphertext = cipher.encrypt(plaintext.encode())
-    return base64.b64encode(ciphertext).decode()
-
-def decrypt_3des_cfb(ciphertext_b64, key, iv):
-    ciphertext = base64.b64decode(ciphertext_b64.encode())
-    cipher = DES3.new(key, DES3.MODE_CFB, iv)
-    decrypted = cipher.decrypt(ciphertext)
-    return decrypted.decode()
+from werkzeug.serving import make_server
+from config import broker, port, topic, qos, publish_timeout, max_inflight, batch_max_items, backend, payload_size
+from config import coalesce_window_ms, coalesce_max_bytes, local_broker, admin_token, keystore
+from config import subscriber_client_id, publisher_client_id, mqtt_protocol, subscription, share_group, shard_depth
+from backends import KEY_GENERATORS
+from publisher import PublisherPool, CoalescingPublisher, PublishError
+from subscriber import DecryptWorkerPool, topic_shard
+from metrics import REGISTRY, CONTENT_TYPE
+from profiling import PROFILER, NULL_TRACE
+from keystore import UnknownDeviceError, device_from_topic
+from readings import ReadingError, parse_batch, encode_reading, describe_reading, split_readings, topic_level
 
 # =======================
 #  MQTT + Flask Section
 # =======================
-broker = 'broker.emqx.io'
-port = 1883
-topic = "suhu/secure"
-subscriber_client_id = 'subscriber-3des'
-publisher_client_id = 'publisher-3des'
+# Publisher persisten (dibuat sekali, reconnect otomatis, QoS 1 + ACK)
+publisher = PublisherPool(
+    broker, port, publisher_client_id,
+    size=int(os.environ.get('MQTT_PUBLISHER_POOL', 1)),
+    qos=qos,
+    timeout=publish_timeout,
+    max_inflight=max_inflight,
+    protocol=mqtt_protocol,
+)
 
-# Kunci tetap selama runtime
-key, iv = generate_key_iv()
+# Opsional: gabungkan pembacaan per COALESCE_WINDOW_MS / COALESCE_MAX_BYTES jadi satu frame
+coalescer = None
+if coalesce_window_ms > 0:
+    coalescer = CoalescingPublisher(publisher, topic, backend.encrypt_message, coalesce_window_ms, coalesce_max_bytes)
 
 app = Flask(__name__)
 
+SUBSCRIBER_RECONNECTS = REGISTRY.counter('mqtt_subscriber_reconnects_total', "Reconnect subscriber ke broker")
+REGISTRY.counter_fn('mqtt_publisher_reconnects_total', "Reconnect publisher ke broker", lambda: publisher.reconnects)
+REGISTRY.gauge_fn('cipher_info', "Cipher yang dipakai aplikasi", lambda: 1,
+                  labels={"cipher": backend.cipher, "engine": backend.engine.name, "mode": backend.mode,
+                          "wire": backend.wire})
+
 # --- Subscriber MQTT ---
+def backend_for_topic(msg_topic):
+    # Mode key store: topik <topic>/<device_id> memakai key perangkat itu
+    if keystore is not None and msg_topic != topic:
+        return keystore.backend(device_from_topic(msg_topic))
+    return backend
+
+def decrypt_readings(msg_topic, payload, trace=NULL_TRACE) -> list:
+    # Satu pesan bisa berisi satu pembacaan atau satu frame berisi banyak pembacaan
+    decrypt_payload = backend_for_topic(msg_topic).decrypt_payload
+    readings = split_readings(PROFILER.profile_call(decrypt_payload, payload, trace))
+    trace.lap('split')
+    return readings
+
+def print_readings(msg_topic, readings):
+    for decrypted in readings:
+        print(f"🔓 Data didekripsi: {describe_reading(decrypted)} ← dari topik '{msg_topic}'")
+
+# Dekripsi di worker pool, bukan di thread jaringan paho
+decrypt_pool = DecryptWorkerPool(
+    decrypt_readings, print_readings,
+    workers=int(os.environ.get('SUBSCRIBER_WORKERS', 2)),
+    queue_size=int(os.environ.get('SUBSCRIBER_QUEUE_SIZE', 1000)),
+    policy=os.environ.get('SUBSCRIBER_QUEUE_POLICY', 'block'),
+    block_timeout=float(os.environ.get('SUBSCRIBER_BLOCK_TIMEOUT', 1.0)),
+    profiler=PROFILER,
+    shard_fn=lambda msg_topic: topic_shard(msg_topic, shard_depth),
+    max_shards=int(os.environ.get('SUBSCRIBER_MAX_SHARDS', 64)),
+)
+
 def start_subscriber():
-    def on_connect(client, userdata, flags, rc):
+    connected_before = []
+
+    # properties hanya dikirim paho untuk MQTT v5
+    def on_connect(client, userdata, flags, rc, properties=None):
         if rc == 0:
+            if connected_before:
+                SUBSCRIBER_RECONNECTS.inc()
+            connected_before.append(True)
             print("✅ Subscriber terhubung ke broker!")
-            client.subscribe(topic)
-            print(f"📡 Menunggu data terenkripsi dari topik '{topic}'...")
+            client.subscribe(subscription)
+            print(f"📡 Menunggu data terenkripsi dari topik '{subscription}'...")
         else:
             print(f"❌ Gagal terhubung: {rc}")
 
     def on_message(client, userdata, msg):
-        try:
-            encrypted_data = msg.payload.decode()
-            decrypted = decrypt_3des_cfb(encrypted_data, key, iv)
-            print(f"🔓 Data didekripsi: {decrypted}°C ← dari topik '{msg.topic}'")
-        except Exception as e:
-            print(f"⚠️ Gagal mendekripsi: {e}")
+        # Hanya enqueue; pesan yang dibuang karena antrean penuh tercatat di /stats
+        decrypt_pool.submit(msg.topic, msg.payload)
 
-    client = mqtt_client.Client(client_id=subscriber_client_id, protocol=mqtt_client.MQTTv311)
+    decrypt_pool.start()
+    client = mqtt_client.Client(client_id=subscriber_client_id, protocol=mqtt_protocol)
     client.on_connect = on_connect
     client.on_message = on_message
     client.connect(broker, port)
@@ -67,7 +102,7 @@ HTML_FORM = """
 <html lang="en">
 <head>
     <meta charset="UTF-8">
-    <title>Kirim Suhu Aman (3DES)</title>
+    <title>Kirim Suhu Aman ({{ label }})</title>
     <style>
         body {
             background: #f2f6fc;
@@ -123,26 +158,37 @@ HTML_FORM = """
 </head>
 <body>
     <div class="card">
-        <h2>Enkripsi Suhu (3DES)</h2>
+        <h2>Enkripsi Suhu ({{ label }})</h2>
         <form action="/send" method="post">
             <label for="suhu">Suhu (°C):</label>
             <input type="number" name="suhu" step="0.1" required>
             <button type="submit">Kirim</button>
         </form>
-        <div class="status">Broker: mqtt://broker.emqx.io<br>Topik: suhu/secure</div>
+        <div class="status">Broker: mqtt://{{ broker }}<br>Topik: {{ topic }}</div>
     </div>
 </body>
 </html>
 """
 
+# Pohon topik <topic>/<site>/<sensor_id> (level yang kosong dilewati), sama
+# untuk /send dan /send/batch. Dengan key store segmen terakhir topik selalu
+# device ID, jadi site tanpa sensor_id ditolak (akan terbaca sebagai perangkat).
+SITE_WITHOUT_SENSOR = "site membutuhkan sensor_id saat key store aktif"
+
+def reading_topic(site, device_id) -> str:
+    return '/'.join([topic] + [level for level in (site, device_id) if level is not None])
+
 @app.route('/')
 def index():
-    return render_template_string(HTML_FORM)
+    return render_template_string(HTML_FORM, label=backend.label, broker=broker, topic=topic)
 
 # --- Publisher ---
 @app.route('/send', methods=['POST'])
 def send_suhu():
+    trace = PROFILER.sample('send')
     suhu = request.form.get('suhu') or request.json.get('suhu')
+    device_id = request.form.get('sensor_id') or (request.get_json(silent=True) or {}).get('sensor_id')
+    site = request.form.get('site') or (request.get_json(silent=True) or {}).get('site')
     if not suhu:
         return jsonify({"error": "Masukkan suhu"}), 400
 
@@ -150,29 +196,226 @@ def send_suhu():
         suhu_str = str(float(suhu))
     except ValueError:
         return jsonify({"error": "Format suhu tidak valid"}), 400
+    try:
+        site = topic_level(site, 'site') if site is not None else None
+        device_id = topic_level(device_id, 'sensor_id') if device_id is not None else None
+    except ReadingError as e:
+        return jsonify({"error": str(e)}), 400
+    if keystore is not None and site is not None and device_id is None:
+        return jsonify({"error": SITE_WITHOUT_SENSOR}), 400
+    trace.lap('parse')
 
-    encrypted = encrypt_3des_cfb(suhu_str, key, iv)
-    print(f"🔐 Suhu dienkripsi: {encrypted}")
-
-    client = mqtt_client.Client(client_id=publisher_client_id, protocol=mqtt_client.MQTTv311)
-    client.connect(broker, port)
-    client.loop_start()
-    time.sleep(1)
-    result = client.publish(topic, encrypted)
-    client.loop_stop()
-
-    if result.rc == 0:
-        return f"<h3>✅ Suhu terenkripsi {suhu_str}°C berhasil dikirim ke '{topic}'</h3><a href='/'>Kembali</a>"
-    else:
+    msg_topic = reading_topic(site, device_id)
+    try:
+        if keystore is not None and device_id:
+            # Key perangkat dari key store (device ID = segmen terakhir topik)
+            encrypted = PROFILER.profile_call(keystore.backend(str(device_id)).encrypt_message, suhu_str, trace)
+            publisher.publish(msg_topic, encrypted, trace=trace)
+        elif msg_topic != topic:
+            encrypted = PROFILER.profile_call(backend.encrypt_message, suhu_str, trace)
+            publisher.publish(msg_topic, encrypted, trace=trace)
+        elif coalescer is not None:
+            coalescer.submit(suhu_str).result(coalesce_window_ms / 1000 + publish_timeout)
+            trace.lap('coalesce')
+        else:
+            encrypted = PROFILER.profile_call(backend.encrypt_message, suhu_str, trace)
+            print(f"🔐 Suhu dienkripsi: {encrypted if isinstance(encrypted, str) else encrypted.hex()}")
+            publisher.publish(topic, encrypted, trace=trace)
+    except UnknownDeviceError:
+        return jsonify({"error": f"Perangkat tidak terdaftar: {device_id}"}), 404
+    except (PublishError, FutureTimeoutError) as e:
+        print(f"❌ Gagal publish: {e}")
         return "<h3>❌ Gagal mengirim suhu</h3>", 500
+    trace.finish()
 
-if __name__ == '__main__':
-    print("🚀 Menjalankan Flask + MQTT Subscriber dengan 3DES...")
+    return f"<h3>✅ Suhu terenkripsi {suhu_str}°C berhasil dikirim ke '{msg_topic}'</h3><a href='/'>Kembali</a>"
+
+def publish_readings(plaintexts, trace=NULL_TRACE) -> list:
+    # Hasil per pembacaan: None jika terkirim, atau pesan error
+    if coalescer is None:
+        payloads = PROFILER.profile_call(backend.encrypt_many, plaintexts)
+        trace.lap('encrypt')
+        errors = publisher.publish_many(topic, payloads)
+        trace.lap('publish')
+        return errors
+    futures = [coalescer.submit(p) for p in plaintexts]
+    deadline = time.monotonic() + coalesce_window_ms / 1000 + publish_timeout
+    errors = []
+    for future in futures:
+        try:
+            future.result(max(deadline - time.monotonic(), 0))
+            errors.append(None)
+        except (PublishError, FutureTimeoutError) as e:
+            errors.append(str(e) or "Tidak ada ACK dari broker sebelum batas waktu")
+    trace.lap('coalesce')
+    return errors
+
+def publish_topic_readings(readings, trace=NULL_TRACE) -> list:
+    # Pembacaan dikelompokkan per topik seperti /send: topik dasar lewat
+    # publish_readings, topik lain dienkripsi per grup dengan key perangkat
+    # (key store) atau key sesi
+    errors = [None] * len(readings)
+    groups = {}
+    for i, reading in enumerate(readings):
+        site, device_id = reading.get('site'), reading.get('sensor_id')
+        if keystore is not None and site is not None and device_id is None:
+            errors[i] = SITE_WITHOUT_SENSOR
+            continue
+        groups.setdefault((site, device_id), []).append(i)
+    for (site, device_id), indexes in groups.items():
+        plaintexts = [encode_reading(readings[i]) for i in indexes]
+        msg_topic = reading_topic(site, device_id)
+        if msg_topic == topic:
+            results = publish_readings(plaintexts, trace)
+        else:
+            try:
+                group_backend = backend if keystore is None else keystore.backend(device_id)
+                results = publisher.publish_many(msg_topic, group_backend.encrypt_many(plaintexts))
+            except UnknownDeviceError:
+                results = [f"Perangkat tidak terdaftar: {device_id}"] * len(indexes)
+            trace.lap('publish')
+        for i, error in zip(indexes, results):
+            errors[i] = error
+    return errors
+
+@app.route('/send/batch', methods=['POST'])
+def send_batch():
+    # Body: [23.5, {"suhu": 24.1, "site": "gudang", "sensor_id": "a1", "timestamp": 1700000000}, ...]
+    trace = PROFILER.sample('batch')
+    try:
+        readings, results = parse_batch(request.get_json(silent=True), batch_max_items)
+    except ReadingError as e:
+        return jsonify({"error": str(e)}), 400
+
+    start = time.perf_counter()
+    trace.lap('parse')
+    errors = publish_topic_readings([r for _, r in readings], trace)
+    trace.finish()
+    for (index, _), error in zip(readings, errors):
+        results[index]['status'] = 'ok' if error is None else 'error'
+        if error is not None:
+            results[index]['error'] = error
+
+    published = sum(1 for r in results if r['status'] == 'ok')
+    failed = len(results) - published
+    print(f"📦 Batch {len(results)} pembacaan: {published} terkirim, {failed} gagal "
+          f"({(time.perf_counter() - start) * 1e3:.1f} ms)")
+    body = {"topic": topic, "total": len(results), "published": published, "failed": failed, "results": results}
+    return jsonify(body), 200 if failed == 0 else 207
+
+@app.route('/metrics')
+def metrics():
+    return REGISTRY.render(), 200, {'Content-Type': CONTENT_TYPE}
+
+# --- Admin: profiling on-demand ---
+def admin_allowed() -> bool:
+    return admin_token is not None and request.headers.get('X-Admin-Token') == admin_token
+
+@app.route('/admin/profile', methods=['GET', 'POST'])
+def admin_profile():
+    # POST {"sample_rate": 0.1, "reset": true, "capture": "start" | "stop"}
+    if not admin_allowed():
+        return jsonify({"error": "Tidak diizinkan"}), 403
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        if 'sample_rate' in body:
+            try:
+                PROFILER.set_rate(body['sample_rate'])
+            except (TypeError, ValueError):
+                return jsonify({"error": "sample_rate harus angka 0..1"}), 400
+        if body.get('reset'):
+            PROFILER.reset()
+        if body.get('capture') == 'start':
+            PROFILER.start_capture()
+        elif body.get('capture') == 'stop':
+            path, summary = PROFILER.stop_capture()
+            return jsonify(dict(PROFILER.stats(), profile_path=path, profile_summary=summary))
+    return jsonify(PROFILER.stats())
+
+# --- Admin: key per perangkat ---
+@app.route('/admin/keys')
+def admin_keys():
+    if not admin_allowed():
+        return jsonify({"error": "Tidak diizinkan"}), 403
+    if keystore is None:
+        return jsonify({"error": "Key store tidak aktif (KEYSTORE_PATH)"}), 404
+    return jsonify(keystore.stats())
+
+@app.route('/admin/keys/<device_id>', methods=['POST', 'DELETE'])
+@app.route('/admin/keys/<device_id>/<action>', methods=['POST'])
+def admin_device_key(device_id, action=None):
+    # POST {"cipher": "simeck"} = daftar, DELETE = cabut, POST .../rotate = rotasi key
+    if not admin_allowed():
+        return jsonify({"error": "Tidak diizinkan"}), 403
+    if keystore is None:
+        return jsonify({"error": "Key store tidak aktif (KEYSTORE_PATH)"}), 404
+    try:
+        if request.method == 'DELETE':
+            keystore.revoke(device_id)
+            return jsonify({"device_id": device_id, "revoked": True})
+        if action == 'rotate':
+            return jsonify({"device_id": device_id, "version": keystore.rotate(device_id)})
+        if action is not None:
+            return jsonify({"error": f"Aksi tidak dikenal: {action}"}), 404
+        cipher_name = (request.get_json(silent=True) or {}).get('cipher', backend.cipher)
+        if cipher_name not in KEY_GENERATORS:
+            return jsonify({"error": f"Cipher tidak dikenal: {cipher_name}"}), 400
+        return jsonify({"device_id": device_id, "version": keystore.add_device(device_id, cipher_name)}), 201
+    except UnknownDeviceError:
+        return jsonify({"error": f"Perangkat tidak terdaftar: {device_id}"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+
+@app.route('/stats')
+def stats():
+    return jsonify(dict(backend.stats(), engine_timings=backend.engine_timings,
+                        publisher_reconnects=publisher.reconnects, subscriber=decrypt_pool.stats(),
+                        subscription=subscription, share_group=share_group,
+                        coalescer=coalescer.stats() if coalescer is not None else None,
+                        keystore=keystore.stats() if keystore is not None else None,
+                        local_broker=local_broker.stats() if local_broker is not None else None))
+
+# --- Role terpisah (dipakai serve.py untuk mode multi-proses) ---
+def run_subscriber():
+    print(f"📡 Proses subscriber {os.getpid()} ({backend.label}, engine: {backend.engine.name})")
+    if float(os.environ.get('SUBSCRIBER_REPORT_SECONDS', 0)) > 0:
+        decrypt_pool.report_every(float(os.environ['SUBSCRIBER_REPORT_SECONDS']), f"subscriber {os.getpid()}")
+    start_subscriber()
+
+def run_publisher(host='127.0.0.1', http_port=5000, fd=None):
+    # Ingest HTTP multi-thread tanpa subscriber; fd = socket listen bersama antar worker
+    publisher.start()
+    if coalescer is not None:
+        coalescer.start()
+    print(f"🌐 Worker ingest {os.getpid()} ({backend.label}, engine: {backend.engine.name})")
+    make_server(host, http_port, app, threaded=True, fd=fd).serve_forever()
+
+def main():
+    role = os.environ.get('APP_ROLE', 'all')
+    if role == 'subscriber':
+        return run_subscriber()
+    if role == 'publisher':
+        return run_publisher(os.environ.get('HTTP_HOST', '127.0.0.1'), int(os.environ.get('HTTP_PORT', 5000)))
+
+    timings = backend.engine_timings or {}
+    print(f"🚀 Menjalankan Flask + MQTT Subscriber dengan {backend.label} "
+          f"(engine: {backend.engine.name}, mode: {backend.mode})...")
+    for name, seconds in timings.items():
+        print(f"   ⏱️ engine {name}: {seconds * 1e6:.1f} µs per payload {payload_size} byte")
+    if PROFILER.rate > 0:
+        print(f"📈 Profiling aktif: {PROFILER.rate:.0%} request/pesan disampel (lihat /admin/profile)")
+    if os.environ.get('PROFILE_CPROFILE_SECONDS'):
+        PROFILER.capture_for(float(os.environ['PROFILE_CPROFILE_SECONDS']))
 
     # Langsung jalankan subscriber thread tanpa syarat env
     sub_thread = threading.Thread(target=start_subscriber)
     sub_thread.daemon = True
     sub_thread.start()
+    publisher.start()
+    if coalescer is not None:
+        coalescer.start()
 
     app.run(debug=True, use_reloader=False)
 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,403 @@
+import os, time, base64
+from Crypto.Cipher import DES3
+from modes import (DEFAULT_SEGMENT_SIZE, CFB_SEGMENT_SIZES, MODE_CTR, BLOCK_BYTES, CFBStream, CTRStream,
+                   KeystreamPool, ctr_encrypt, ctr_decrypt, scalar_keystream, unpack_cfb, xor_bytes)
+from envelope import CIPHER_IDS, WIRE_FORMATS, is_envelope, new_envelope, unpack_envelope
+from metrics import REGISTRY
+from profiling import NULL_TRACE
+from simeck import np, Simeck64_128, SimeckBatch, SimeckSWAR, simeck_cache, generate_simeck_key_iv
+from skinny import Skinny64, generate_skinny_key_iv
+from tdes import TripleDESStream, generate_key_iv
+
+# =======================
+#  Engine Section
+# =======================
+# Engine = satu implementasi block cipher 64-bit. Mode (CFB/CTR), flag
+# payload dan base64 diurus CipherBackend, jadi engine untuk cipher yang
+# sama harus menghasilkan ciphertext yang identik.
+class Engine:
+    name = None
+
+    def __init__(self, key):
+        self.key = key
+
+    # Key schedule yang sudah diekspansi, untuk dikirim ke worker proses
+    # (bulk.py) supaya worker tidak menghitungnya ulang dari key mentah.
+    # Default: key itu sendiri (3DES, schedule-nya di dalam PyCryptodome).
+    @property
+    def round_keys(self):
+        return self.key
+
+    @classmethod
+    def from_round_keys(cls, round_keys):
+        return cls(round_keys)
+
+    def encrypt_block(self, block: int) -> int:
+        raise NotImplementedError
+
+    def keystream(self, counter: int, nblocks: int) -> bytes:
+        return scalar_keystream(self.encrypt_block, counter, nblocks)
+
+    def cfb_encrypt(self, data, iv: bytes, segment_size: int, out) -> int:
+        return CFBStream(self.encrypt_block, iv, segment_size).update(data, out)
+
+    def cfb_decrypt(self, data, iv: bytes, segment_size: int, out) -> int:
+        return CFBStream(self.encrypt_block, iv, segment_size, decrypt=True).update(data, out)
+
+    def cfb_stream(self, iv: bytes, segment_size: int, decrypt=False):
+        return CFBStream(self.encrypt_block, iv, segment_size, decrypt=decrypt)
+
+class SimeckScalarEngine(Engine):
+    name = 'scalar'
+
+    def __init__(self, key: int):
+        super().__init__(key)
+        self._use(simeck_cache.get(key, 64, 128))
+
+    @classmethod
+    def from_round_keys(cls, round_keys):
+        engine = cls.__new__(cls)
+        Engine.__init__(engine, None)
+        engine._use(Simeck64_128.from_round_keys(round_keys))
+        return engine
+
+    def _use(self, simeck):
+        self.simeck = simeck
+        self.encrypt_block = simeck.encrypt
+
+    @property
+    def round_keys(self):
+        return self.simeck.round_keys
+
+class SimeckBatchEngine(SimeckScalarEngine):
+    # Enkripsi CFB tetap berurutan (scalar); keystream CTR dan dekripsi
+    # CFB dihitung sekaligus dengan NumPy.
+    name = 'batch'
+
+    def _use(self, simeck):
+        super()._use(simeck)
+        self.batch = SimeckBatch(simeck)
+
+    def keystream(self, counter: int, nblocks: int) -> bytes:
+        return self.batch.keystream(counter, nblocks)
+
+    def cfb_decrypt(self, data, iv: bytes, segment_size: int, out) -> int:
+        n = len(data)
+        memoryview(out).cast('B')[:n] = self.batch.cfb_decrypt(bytes(data), iv, segment_size)
+        return n
+
+class SimeckSWAREngine(SimeckScalarEngine):
+    # Seperti engine batch tapi tanpa NumPy: semua blok dalam satu int Python
+    name = 'swar'
+
+    def _use(self, simeck):
+        super()._use(simeck)
+        self.swar = SimeckSWAR(simeck)
+
+    def keystream(self, counter: int, nblocks: int) -> bytes:
+        return self.swar.keystream(counter, nblocks)
+
+    def cfb_decrypt(self, data, iv: bytes, segment_size: int, out) -> int:
+        n = len(data)
+        memoryview(out).cast('B')[:n] = self.swar.cfb_decrypt(bytes(data), iv, segment_size)
+        return n
+
+class SkinnyTableEngine(Engine):
+    name = 'table'
+
+    def __init__(self, key: bytes):
+        super().__init__(key)
+        self._use(Skinny64(key))
+
+    @classmethod
+    def from_round_keys(cls, round_keys):
+        engine = cls.__new__(cls)
+        Engine.__init__(engine, None)
+        engine._use(Skinny64.from_round_keys(round_keys))
+        return engine
+
+    def _use(self, skinny):
+        self.skinny = skinny
+        self.encrypt_block = skinny.encrypt_block
+
+    @property
+    def round_keys(self):
+        return self.skinny.round_keys
+
+class TripleDESEngine(Engine):
+    # Semua mode lewat PyCryptodome (C); ECB dipakai untuk blok tunggal dan keystream CTR.
+    # Key setup DES3.new (~60 µs) jauh lebih mahal dari satu blok ECB (~3 µs), jadi
+    # CFB-64 pesan pendek dan semua dekripsi CFB-64 memakai objek ECB yang sudah ada.
+    name = 'pycryptodome'
+    ECB_CFB_MAX_BLOCKS = 8
+
+    def __init__(self, key: bytes):
+        super().__init__(key)
+        self._ecb = DES3.new(key, DES3.MODE_ECB)
+
+    def encrypt_block(self, block: int) -> int:
+        return int.from_bytes(self._ecb.encrypt(block.to_bytes(8, 'big')), 'big')
+
+    def keystream(self, counter: int, nblocks: int) -> bytes:
+        counters = b''.join(((counter + i) & 0xFFFFFFFFFFFFFFFF).to_bytes(8, 'big') for i in range(nblocks))
+        return self._ecb.encrypt(counters)
+
+    def cfb_encrypt(self, data, iv: bytes, segment_size: int, out) -> int:
+        n = len(data)
+        if segment_size == 64 and n <= self.ECB_CFB_MAX_BLOCKS * 8:
+            dst = memoryview(out).cast('B')
+            encrypt, prev = self._ecb.encrypt, iv
+            for i in range(0, n, 8):
+                prev = xor_bytes(data[i:i + 8], encrypt(prev))
+                dst[i:i + len(prev)] = prev
+            return n
+        DES3.new(self.key, DES3.MODE_CFB, iv, segment_size=segment_size).encrypt(data, output=memoryview(out).cast('B')[:n])
+        return n
+
+    def cfb_decrypt(self, data, iv: bytes, segment_size: int, out) -> int:
+        n = len(data)
+        if segment_size == 64:
+            # Input tiap blok = ciphertext blok sebelumnya: satu panggilan ECB
+            if n:
+                keystream = self._ecb.encrypt(iv + bytes(data[:(n - 1) // 8 * 8]))
+                memoryview(out).cast('B')[:n] = xor_bytes(data, keystream)
+            return n
+        DES3.new(self.key, DES3.MODE_CFB, iv, segment_size=segment_size).decrypt(data, output=memoryview(out).cast('B')[:n])
+        return n
+
+    def cfb_stream(self, iv: bytes, segment_size: int, decrypt=False):
+        return TripleDESStream(self.key, iv, segment_size, decrypt)
+
+# Registry cipher -> engine yang tersedia, plus pembuat key/iv sesi
+ENGINES = {
+    'simeck': {'scalar': SimeckScalarEngine, 'swar': SimeckSWAREngine},
+    'skinny': {'table': SkinnyTableEngine},
+    '3des': {'pycryptodome': TripleDESEngine},
+}
+if np is not None:
+    ENGINES['simeck']['batch'] = SimeckBatchEngine
+
+KEY_GENERATORS = {
+    'simeck': generate_simeck_key_iv,
+    'skinny': generate_skinny_key_iv,
+    '3des': generate_key_iv,
+}
+
+CIPHER_LABELS = {'simeck': 'Simeck', 'skinny': 'Skinny', '3des': '3DES'}
+
+# =======================
+#  Backend Section
+# =======================
+ENCRYPT_SECONDS = REGISTRY.histogram('cipher_encrypt_seconds', "Waktu enkripsi per pesan (payload siap publish)")
+DECRYPT_SECONDS = REGISTRY.histogram('cipher_decrypt_seconds', "Waktu dekripsi per pesan")
+
+class CipherBackend:
+    def __init__(self, cipher: str, engine: Engine, iv: bytes, mode='cfb', segment_size=DEFAULT_SEGMENT_SIZE,
+                 pool_depth=1024, refill_chunk=128, wire='binary', nonce=None):
+        if mode not in ('cfb', 'ctr'):
+            raise ValueError(f"Mode tidak dikenal: {mode}")
+        if wire not in WIRE_FORMATS:
+            raise ValueError(f"Format payload tidak dikenal: {wire}")
+        self.cipher = cipher
+        self.cipher_id = CIPHER_IDS[cipher]
+        self.wire = wire
+        self.label = CIPHER_LABELS[cipher]
+        self.engine = engine
+        self.iv = iv
+        self.mode = mode
+        self.segment_size = segment_size
+        self.pool = None
+        if mode == 'ctr':
+            # nonce = 32 bit atas counter CTR; None = acak (cukup untuk satu backend per key)
+            self.pool = KeystreamPool(engine.keystream, pool_depth, refill_chunk, nonce)
+
+    def start(self):
+        if self.pool is not None:
+            self.pool.start()
+        return self
+
+    def encrypt_bytes(self, data: bytes) -> bytes:
+        if self.mode == 'ctr':
+            return ctr_encrypt(self.pool, data)
+        payload = bytearray(1 + len(data))
+        payload[0] = self.segment_size  # flag mode CFB
+        self.engine.cfb_encrypt(data, self.iv, self.segment_size, memoryview(payload)[1:])
+        return bytes(payload)
+
+    def decrypt_bytes(self, payload: bytes) -> bytes:
+        # Mode dibaca dari flag byte pertama payload (CFB-8/CFB-64/CTR)
+        payload = memoryview(payload)
+        if payload[0] == MODE_CTR:
+            return ctr_decrypt(self.engine.keystream, payload)
+        segment_size, ciphertext = unpack_cfb(payload)
+        plaintext = bytearray(len(ciphertext))
+        self.engine.cfb_decrypt(ciphertext, self.iv, segment_size, plaintext)
+        return bytes(plaintext)
+
+    def encrypt(self, plaintext: str) -> str:
+        return base64.b64encode(self.encrypt_bytes(plaintext.encode())).decode()
+
+    def decrypt(self, ciphertext_b64: str) -> str:
+        return self.decrypt_bytes(base64.b64decode(ciphertext_b64)).decode()
+
+    # --- Envelope biner: IV/counter per pesan, tanpa base64 ---
+    def encrypt_envelope(self, data: bytes) -> bytearray:
+        if self.mode == 'ctr':
+            counter, keystream = self.pool.take(-(-len(data) // BLOCK_BYTES))
+            return self._seal_ctr(counter, data, keystream)
+        iv = os.urandom(BLOCK_BYTES)
+        payload, body = new_envelope(self.cipher_id, self.segment_size, iv, len(data))
+        self.engine.cfb_encrypt(data, iv, self.segment_size, body)
+        return payload
+
+    def _unpack_envelope(self, payload):
+        cipher_id, mode, nonce, ciphertext = unpack_envelope(payload)
+        if cipher_id != self.cipher_id:
+            raise ValueError(f"Envelope untuk cipher id {cipher_id}, backend ini {self.cipher} ({self.cipher_id})")
+        return mode, nonce, ciphertext
+
+    def decrypt_envelope(self, payload) -> bytes:
+        mode, nonce, ciphertext = self._unpack_envelope(payload)
+        plaintext = bytearray(len(ciphertext))
+        if mode == MODE_CTR:
+            CTRStream(self.engine.keystream, int.from_bytes(nonce, 'big')).update(ciphertext, plaintext)
+        elif mode in CFB_SEGMENT_SIZES:
+            self.engine.cfb_decrypt(ciphertext, nonce, mode, plaintext)
+        else:
+            raise ValueError(f"Flag mode tidak dikenal: {mode}")
+        return bytes(plaintext)
+
+    # --- Stream untuk data panjang (mis. file), format envelope biner ---
+    # encryptor(size) -> (header, stream): kirim header lalu stream.update()
+    # per potongan. Di mode CTR counter untuk seluruh size byte dicadangkan
+    # di awal, jadi size wajib diketahui. decryptor(header) membaca mode dan
+    # IV/counter dari header (HEADER.size byte pertama envelope).
+    def encryptor(self, size: int):
+        if self.mode == 'ctr':
+            nblocks = -(-size // BLOCK_BYTES)
+            counter = self.pool.reserve(nblocks)
+            mode, nonce = MODE_CTR, counter.to_bytes(BLOCK_BYTES, 'big')
+            stream = CTRStream(self.engine.keystream, counter, nblocks)
+        else:
+            mode, nonce = self.segment_size, os.urandom(BLOCK_BYTES)
+            stream = self.engine.cfb_stream(nonce, self.segment_size)
+        header, _ = new_envelope(self.cipher_id, mode, nonce, 0)
+        return bytes(header), stream
+
+    def decryptor(self, header):
+        mode, nonce, _ = self._unpack_envelope(header)
+        if mode == MODE_CTR:
+            return CTRStream(self.engine.keystream, int.from_bytes(nonce, 'big'))
+        if mode in CFB_SEGMENT_SIZES:
+            return self.engine.cfb_stream(nonce, mode, decrypt=True)
+        raise ValueError(f"Flag mode tidak dikenal: {mode}")
+
+    def _seal_ctr(self, counter: int, data: bytes, keystream):
+        if self.wire == 'base64':
+            payload = bytes([MODE_CTR]) + counter.to_bytes(BLOCK_BYTES, 'big') + xor_bytes(data, keystream)
+            return base64.b64encode(payload).decode()
+        payload, body = new_envelope(self.cipher_id, MODE_CTR, counter.to_bytes(BLOCK_BYTES, 'big'), len(data))
+        body[:] = xor_bytes(data, keystream)
+        return payload
+
+    # --- Payload siap publish sesuai format wire (binary | base64) ---
+    def encrypt_message(self, plaintext, trace=NULL_TRACE):
+        start = time.perf_counter()
+        data = plaintext.encode() if isinstance(plaintext, str) else plaintext
+        if self.wire == 'base64':
+            ciphertext = self.encrypt_bytes(data)
+            trace.lap('encrypt')
+            payload = base64.b64encode(ciphertext).decode()
+            trace.lap('base64')
+        else:
+            payload = self.encrypt_envelope(data)
+            trace.lap('encrypt')
+        ENCRYPT_SECONDS.observe(time.perf_counter() - start)
+        return payload
+
+    def decrypt_payload(self, payload, trace=NULL_TRACE) -> bytes:
+        # Subscriber menerima dua format: envelope biner dan base64 lama
+        start = time.perf_counter()
+        if is_envelope(payload):
+            plaintext = self.decrypt_envelope(payload)
+        else:
+            ciphertext = base64.b64decode(payload)
+            trace.lap('base64')
+            plaintext = self.decrypt_bytes(ciphertext)
+        trace.lap('decrypt')
+        DECRYPT_SECONDS.observe(time.perf_counter() - start)
+        return plaintext
+
+    def decrypt_message(self, payload) -> str:
+        return self.decrypt_payload(payload).decode()
+
+    def encrypt_many(self, plaintexts) -> list:
+        # Satu batch memakai engine (key schedule) yang sama; di mode CTR
+        # keystream seluruh batch diambil sekali dari pool
+        if self.mode != 'ctr' or not plaintexts:
+            return [self.encrypt_message(p) for p in plaintexts]
+        start = time.perf_counter()
+        datas = [p.encode() for p in plaintexts]
+        counter, keystream = self.pool.take(sum(-(-len(d) // BLOCK_BYTES) for d in datas))
+        keystream = memoryview(keystream)
+        payloads, offset = [], 0
+        for data in datas:
+            payloads.append(self._seal_ctr(counter, data, keystream[offset:]))
+            nblocks = -(-len(data) // BLOCK_BYTES)
+            counter = (counter + nblocks) & 0xFFFFFFFFFFFFFFFF  # counter 64-bit berputar seperti KeystreamPool
+            offset += nblocks * BLOCK_BYTES
+        per_message = (time.perf_counter() - start) / len(payloads)
+        for _ in payloads:
+            ENCRYPT_SECONDS.observe(per_message)
+        return payloads
+
+    def stats(self):
+        return {
+            "cipher": self.cipher,
+            "engine": self.engine.name,
+            "mode": self.mode,
+            "segment_size": self.segment_size,
+            "wire": self.wire,
+            "key_cache": simeck_cache.stats() if self.cipher == 'simeck' else None,
+            "keystream_pool": self.pool.stats() if self.pool is not None else None,
+        }
+
+def benchmark_engines(cipher: str, key, iv: bytes, mode='cfb', segment_size=DEFAULT_SEGMENT_SIZE,
+                      payload_size=16, repeat=20):
+    # Micro-benchmark singkat: waktu enkripsi+dekripsi satu payload per engine
+    data = os.urandom(payload_size)
+    timings, reference = {}, None
+    for name, engine_cls in ENGINES[cipher].items():
+        # Pool CTR tidak dijalankan: yang diukur biaya keystream engine itu sendiri
+        backend = CipherBackend(cipher, engine_cls(key), iv, mode, segment_size, pool_depth=0)
+        reference = reference or backend
+        # Payload tiap engine harus bisa didekripsi engine lain (publisher/subscriber
+        # bisa memilih engine berbeda)
+        payload = backend.encrypt_bytes(data)
+        if backend.decrypt_bytes(payload) != data or reference.decrypt_bytes(payload) != data:
+            raise RuntimeError(f"Engine {cipher}/{name} tidak kompatibel dengan engine lain")
+
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            backend.decrypt_bytes(backend.encrypt_bytes(data))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+    return timings
+
+def create_backend(cipher: str, key, iv: bytes, engine='auto', mode='cfb', segment_size=DEFAULT_SEGMENT_SIZE,
+                   payload_size=16, pool_depth=1024, refill_chunk=128, wire='binary', nonce=None):
+    if cipher not in ENGINES:
+        raise ValueError(f"Cipher tidak dikenal: {cipher}")
+    timings = None
+    if engine == 'auto':
+        timings = benchmark_engines(cipher, key, iv, mode, segment_size, payload_size)
+        engine = min(timings, key=timings.get)
+    elif engine not in ENGINES[cipher]:
+        raise ValueError(f"Engine '{engine}' tidak tersedia untuk {cipher}: {', '.join(ENGINES[cipher])}")
+
+    backend = CipherBackend(cipher, ENGINES[cipher][engine](key), iv, mode, segment_size, pool_depth, refill_chunk,
+                            wire, nonce)
+    backend.engine_timings = timings
+    return backend
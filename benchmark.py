@@ -0,0 +1,232 @@
+import argparse, gc, json, os, platform, statistics, sys, time, tracemalloc
+from backends import ENGINES, KEY_GENERATORS, CipherBackend
+from simeck import simeck_cache
+from skinny import tweakey_schedule
+
+# =======================
+#  Benchmark Harness Section
+# =======================
+# Harness bersama untuk semua cipher/engine: perf_counter_ns, warmup,
+# jumlah iterasi per sampel dipilih otomatis (autorange), statistik
+# median/stdev/persentil, dan pemisahan biaya setup (key schedule),
+# biaya tetap per pesan dan biaya per byte (regresi linear atas beberapa
+# ukuran payload). Hasil JSON bisa dibandingkan dengan baseline; regresi
+# melebihi --max-regression persen membuat proses keluar dengan kode 1.
+def percentile(sorted_values, p):
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "median_ns": statistics.median(ordered),
+        "mean_ns": statistics.fmean(ordered),
+        "stdev_ns": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "min_ns": ordered[0],
+        "max_ns": ordered[-1],
+        "p95_ns": percentile(ordered, 95),
+        "p99_ns": percentile(ordered, 99),
+        "samples": len(ordered),
+    }
+
+def autorange(fn, min_time_ns):
+    # Jumlah panggilan per sampel supaya satu sampel >= min_time_ns
+    number = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        if time.perf_counter_ns() - start >= min_time_ns or number >= 1 << 20:
+            return number
+        number *= 2
+
+def measure(fn, warmup, repeat, min_time_ns):
+    number = autorange(fn, min_time_ns)
+    for _ in range(warmup):
+        for _ in range(number):
+            fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter_ns() - start) / number)
+    return summarize(samples)
+
+def measure_memory(fn, iterations=50):
+    # tracemalloc terpisah dari pengukuran waktu (tracing memperlambat):
+    #   peak_bytes        puncak alokasi di atas baseline selama satu panggilan
+    #   retained_*_per_op blok/byte yang masih hidup setelah banyak panggilan
+    #                     (harusnya ~0; positif berarti ada yang menumpuk)
+    fn()  # inisialisasi lazy/cache tidak ikut terhitung
+    gc.collect()
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    tracemalloc.start()
+    try:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        before = tracemalloc.take_snapshot().filter_traces(ignore)
+        for _ in range(iterations):
+            fn()
+        gc.collect()
+        after = tracemalloc.take_snapshot().filter_traces(ignore)
+    finally:
+        tracemalloc.stop()
+    diff = after.compare_to(before, 'filename')
+    return {
+        "peak_bytes": peak - current,
+        "retained_blocks_per_op": sum(d.count_diff for d in diff) / iterations,
+        "retained_bytes_per_op": sum(d.size_diff for d in diff) / iterations,
+    }
+
+def fit_linear(sizes, times):
+    # times ~= fixed_ns + ns_per_byte * size (least squares)
+    mean_x, mean_y = statistics.fmean(sizes), statistics.fmean(times)
+    var_x = sum((x - mean_x) ** 2 for x in sizes)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(sizes, times)) / var_x if var_x else 0.0
+    return {"fixed_ns": mean_y - slope * mean_x, "ns_per_byte": slope}
+
+def clear_key_caches():
+    simeck_cache.clear()
+    tweakey_schedule.cache_clear()
+
+def bench_case(cipher, engine, mode, sizes, warmup, repeat, min_time_ns, key_bits=None, memory=False):
+    key, iv = KEY_GENERATORS[cipher]()
+    if key_bits is not None:
+        key = os.urandom(key_bits // 8)
+    engine_cls = ENGINES[cipher][engine]
+
+    def setup():
+        # Cache key schedule dikosongkan: yang diukur ekspansi kunci dingin
+        clear_key_caches()
+        return CipherBackend(cipher, engine_cls(key), iv, mode, pool_depth=0)
+
+    result = {"cipher": cipher, "engine": engine, "mode": mode, "key_bits": key_bits,
+              "setup": measure(setup, warmup, repeat, min_time_ns), "sizes": {}}
+    if memory:
+        result["setup_memory"] = measure_memory(setup, iterations=5)
+    # Pool CTR tidak dijalankan: keystream dihitung inline, biaya engine terukur penuh
+    backend = setup()
+    for size in sizes:
+        data = os.urandom(size)
+        payload = backend.encrypt_bytes(data)
+        if backend.decrypt_bytes(payload) != data:
+            raise RuntimeError(f"{cipher}/{engine}/{mode}: dekripsi tidak cocok")
+        encrypt = measure(lambda: backend.encrypt_bytes(data), warmup, repeat, min_time_ns)
+        decrypt = measure(lambda: backend.decrypt_bytes(payload), warmup, repeat, min_time_ns)
+        result["sizes"][str(size)] = {
+            "encrypt": encrypt,
+            "decrypt": decrypt,
+            "encrypt_MBps": size / encrypt["median_ns"] * 1e3,
+            "decrypt_MBps": size / decrypt["median_ns"] * 1e3,
+        }
+        if memory:
+            result["sizes"][str(size)]["memory"] = {
+                "encrypt": measure_memory(lambda: backend.encrypt_bytes(data)),
+                "decrypt": measure_memory(lambda: backend.decrypt_bytes(payload)),
+            }
+    for op in ('encrypt', 'decrypt'):
+        result[f"{op}_fit"] = fit_linear(sizes, [result["sizes"][str(s)][op]["median_ns"] for s in sizes])
+    return result
+
+def case_name(result):
+    name = f"{result['cipher']}/{result['engine']}/{result['mode']}"
+    return name if result["key_bits"] is None else f"{name}/k{result['key_bits']}"
+
+def compare(results, baseline, max_regression, stat='median_ns'):
+    # Bandingkan statistik per ukuran payload; positif = lebih lambat dari baseline
+    regressions = []
+    print(f"\n{'Case':<30}{'Size':<8}{'Op':<9}{'Baseline µs':<14}{'Now µs':<12}{'Change':<10}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<30}(tidak ada di baseline)")
+            continue
+        for size, now in result["sizes"].items():
+            if size not in base["sizes"]:
+                continue
+            for op in ('encrypt', 'decrypt'):
+                before = base["sizes"][size][op][stat]
+                after = now[op][stat]
+                change = (after - before) / before * 100
+                flag = " ❌" if change > max_regression else ""
+                print(f"{name:<30}{size:<8}{op:<9}{before / 1e3:<14.2f}{after / 1e3:<12.2f}{change:+.1f}%{flag}")
+                if change > max_regression:
+                    regressions.append((name, size, op, change))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cipher/engine dengan statistik dan baseline")
+    parser.add_argument('--ciphers', default='3des,simeck,skinny')
+    parser.add_argument('--engines', default='', help="filter nama engine (default: semua)")
+    parser.add_argument('--modes', default='cfb,ctr')
+    parser.add_argument('--sizes', default='16,64,256,1024', help="ukuran payload (byte)")
+    parser.add_argument('--key-bits', default='', help="ukuran key Skinny, mis. 64,128,192")
+    parser.add_argument('--warmup', type=int, default=3, help="sampel warmup yang dibuang")
+    parser.add_argument('--repeat', type=int, default=15, help="jumlah sampel")
+    parser.add_argument('--min-time-ms', type=float, default=5.0, help="durasi minimal satu sampel")
+    parser.add_argument('--memory', action='store_true', help="ukur juga alokasi memori (tracemalloc)")
+    parser.add_argument('--json', default=None, help="tulis hasil JSON ke file ini")
+    parser.add_argument('--baseline', default=None, help="file JSON baseline untuk pembanding")
+    parser.add_argument('--max-regression', type=float, default=10.0, help="batas regresi (persen)")
+    parser.add_argument('--gate-stat', default='median', choices=('median', 'min'),
+                        help="statistik pembanding baseline; min lebih tahan noise di mesin bersama")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    engines = set(filter(None, args.engines.split(',')))
+    min_time_ns = args.min_time_ms * 1e6
+    results = {}
+    print(f"{'Case':<30}{'Size':<8}{'Enc µs':<10}{'p95':<10}{'±sd':<9}{'Dec µs':<10}{'p95':<10}{'±sd':<9}{'MB/s':<8}")
+    for cipher in args.ciphers.split(','):
+        key_bits_list = [int(k) for k in args.key_bits.split(',') if k] if cipher == 'skinny' else []
+        for engine in ENGINES[cipher]:
+            if engines and engine not in engines:
+                continue
+            for mode in args.modes.split(','):
+                for key_bits in key_bits_list or [None]:
+                    result = bench_case(cipher, engine, mode, sizes, args.warmup, args.repeat, min_time_ns, key_bits,
+                                        args.memory)
+                    name = case_name(result)
+                    results[name] = result
+                    for size, stat in result["sizes"].items():
+                        enc, dec = stat["encrypt"], stat["decrypt"]
+                        print(f"{name:<30}{size:<8}{enc['median_ns'] / 1e3:<10.2f}{enc['p95_ns'] / 1e3:<10.2f}"
+                              f"{enc['stdev_ns'] / 1e3:<9.2f}{dec['median_ns'] / 1e3:<10.2f}"
+                              f"{dec['p95_ns'] / 1e3:<10.2f}{dec['stdev_ns'] / 1e3:<9.2f}{stat['encrypt_MBps']:<8.3f}")
+                    fit = result["encrypt_fit"]
+                    print(f"   ⏱️ setup {result['setup']['median_ns'] / 1e3:.1f} µs, "
+                          f"per pesan {fit['fixed_ns'] / 1e3:.2f} µs + {fit['ns_per_byte']:.1f} ns/byte")
+                    if args.memory:
+                        print(f"   🧠 setup peak {result['setup_memory']['peak_bytes']} B; peak enc/dec per ukuran: "
+                              + ", ".join(f"{size}: {stat['memory']['encrypt']['peak_bytes']}/"
+                                          f"{stat['memory']['decrypt']['peak_bytes']} B"
+                                          for size, stat in result["sizes"].items()))
+                        leaks = [f"{size}/{op}" for size, stat in result["sizes"].items()
+                                 for op in ('encrypt', 'decrypt') if stat['memory'][op]['retained_blocks_per_op'] >= 1]
+                        if leaks:
+                            print(f"   ⚠️ blok tertahan per panggilan: {', '.join(leaks)}")
+
+    meta = {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'), "warmup": args.warmup, "repeat": args.repeat,
+            "min_time_ms": args.min_time_ms}
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or '.', exist_ok=True)
+        with open(args.json, 'w') as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+        print(f"💾 {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.max_regression, f"{args.gate_stat}_ns")
+        if regressions:
+            print(f"\n❌ {len(regressions)} pengukuran lebih lambat dari {args.max_regression:.0f}% baseline")
+            return 1
+        print(f"\n✅ Tidak ada regresi di atas {args.max_regression:.0f}%")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+import argparse, csv, json, os, platform, threading, time
+from paho.mqtt import client as mqtt_client
+from backends import KEY_GENERATORS, create_backend
+from localbroker import LocalBroker
+from publisher import MQTTPublisher, CoalescingPublisher, wait_for_acks
+from readings import split_readings
+from subscriber import DecryptWorkerPool, process_rss
+
+try:
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+except ImportError:  # grafik opsional
+    plt = None
+
+# =======================
+#  End-to-End Benchmark Section
+# =======================
+# Mengukur seluruh pipeline: ingest -> enkripsi -> publish -> broker ->
+# terima -> dekripsi, per cipher/mode/ukuran payload. Latency diukur dari
+# sebelum enkripsi sampai selesai dekripsi (satu proses, satu jam
+# perf_counter). Default memakai broker loopback supaya hasil bisa diulang.
+SEQ_DIGITS = 10
+
+def make_reading(seq: int, size: int) -> str:
+    # Nomor urut di depan supaya subscriber bisa mencocokkan waktu kirim
+    return f"{seq:0{SEQ_DIGITS}d}".ljust(max(size, SEQ_DIGITS), '.')
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+class RSSSampler:
+    # Sampling resident memory proses (publisher + broker + subscriber) selama run
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.start_bytes = self.peak_bytes = self.end_bytes = process_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = process_rss()
+            if rss is not None and rss > (self.peak_bytes or 0):
+                self.peak_bytes = rss
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.end_bytes = process_rss()
+
+def mb(nbytes):
+    return nbytes / 2**20 if nbytes is not None else None
+
+def run_case(cipher, mode, size, count, host, port, local_broker=None, wire='binary', engine='auto',
+             coalesce_ms=0, coalesce_bytes=1024, rate=0, qos=1, timeout=60.0):
+    key, iv = KEY_GENERATORS[cipher]()
+    backend = create_backend(cipher, key, iv, engine=engine, mode=mode, payload_size=size, wire=wire).start()
+    tag = f"{cipher}-{mode}-{size}-{os.getpid()}"
+    topic = f"bench/{tag}"
+
+    sent = [0] * count
+    received = [0] * count
+    received_count = [0]
+    all_received = threading.Event()
+
+    def on_readings(msg_topic, readings):
+        now = time.perf_counter_ns()
+        for reading in readings:
+            received[int(reading[:SEQ_DIGITS])] = now
+        received_count[0] += len(readings)
+        if received_count[0] >= count:
+            all_received.set()
+
+    decrypt_pool = DecryptWorkerPool(lambda _, payload: split_readings(backend.decrypt_payload(payload)), on_readings,
+                                     workers=1, queue_size=count + 1).start()
+    subscribed = threading.Event()
+    subscriber = mqtt_client.Client(client_id=f"bench-sub-{tag}", protocol=mqtt_client.MQTTv311)
+    subscriber.on_connect = lambda client, userdata, flags, rc: client.subscribe(topic, qos)
+    subscriber.on_subscribe = lambda client, userdata, mid, granted: subscribed.set()
+    subscriber.on_message = lambda client, userdata, msg: decrypt_pool.submit(msg.topic, msg.payload)
+    subscriber.connect(host, port)
+    subscriber.loop_start()
+
+    publisher = MQTTPublisher(host, port, f"bench-pub-{tag}", qos=qos, timeout=timeout, max_inflight=1000).start()
+    if not (publisher.wait_connected(10) and subscribed.wait(10)):
+        raise RuntimeError(f"Tidak bisa terhubung ke broker {host}:{port}")
+
+    payload_bytes = [0]
+
+    def encrypt_counted(plaintext):
+        payload = backend.encrypt_message(plaintext)
+        payload_bytes[0] += len(payload)
+        return payload
+
+    readings = [make_reading(i, size) for i in range(count)]
+
+    def pace(i):
+        # rate > 0: kirim merata (latency tanpa antrean); 0 = secepat mungkin (throughput)
+        if rate > 0:
+            delay = start / 1e9 + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    wire_before = local_broker.bytes_in if local_broker is not None else None
+    rss = RSSSampler().start()
+    cpu_start = time.process_time()
+    start = time.perf_counter_ns()
+    deadline = time.monotonic() + timeout
+    if coalesce_ms > 0:
+        coalescer = CoalescingPublisher(publisher, topic, encrypt_counted, coalesce_ms, coalesce_bytes).start()
+        futures = []
+        for i, reading in enumerate(readings):
+            pace(i)
+            sent[i] = time.perf_counter_ns()
+            futures.append(coalescer.submit(reading))
+        for future in futures:
+            future.exception(max(deadline - time.monotonic(), 0))
+        coalescer.stop()
+    else:
+        infos = []
+        for i, reading in enumerate(readings):
+            pace(i)
+            sent[i] = time.perf_counter_ns()
+            infos.append(publisher.submit(topic, encrypt_counted(reading), deadline=deadline))
+        wait_for_acks(infos, deadline, [publisher] * len(infos))
+    all_received.wait(max(deadline - time.monotonic(), 0))
+    decrypt_pool.stop()
+    elapsed_s = (max(received) - start) / 1e9 if any(received) else None
+    cpu_s = time.process_time() - cpu_start
+    rss.stop()
+
+    publisher.stop()
+    subscriber.disconnect()
+    subscriber.loop_stop()
+    if backend.pool is not None:
+        backend.pool.stop()
+
+    latencies = sorted((r - s) / 1e6 for s, r in zip(sent, received) if r)
+    got = len(latencies)
+    return {
+        "cipher": cipher,
+        "engine": backend.engine.name,
+        "mode": mode,
+        "wire": wire,
+        "payload_size": size,
+        "coalesce_ms": coalesce_ms,
+        "rate": rate,
+        "count": count,
+        "received": got,
+        "msgs_per_s": got / elapsed_s if elapsed_s else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": latencies[-1] if latencies else None,
+        "payload_bytes_per_msg": payload_bytes[0] / count,
+        # Semua byte masuk broker: PUBLISH + header MQTT + PUBACK subscriber (hanya broker loopback)
+        "wire_bytes_per_msg": (local_broker.bytes_in - wire_before) / count if local_broker is not None else None,
+        "cpu_s": cpu_s,
+        "cpu_us_per_msg": cpu_s / count * 1e6,
+        "rss_start_mb": mb(rss.start_bytes),
+        "rss_peak_mb": mb(rss.peak_bytes),
+        "rss_end_mb": mb(rss.end_bytes),
+    }
+
+def write_results(rows, out_dir, plot=False):
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    csv_path = os.path.join(out_dir, f"e2e_{stamp}.csv")
+    json_path = os.path.join(out_dir, f"e2e_{stamp}.json")
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    meta = {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "timestamp": stamp}
+    with open(json_path, 'w') as f:
+        json.dump({"meta": meta, "results": rows}, f, indent=2)
+    paths = [csv_path, json_path]
+
+    if plot:
+        if plt is None:
+            print("⚠️ matplotlib tidak terpasang, grafik dilewati")
+        else:
+            labels = [f"{r['cipher']}/{r['mode']}/{r['payload_size']}" for r in rows]
+            fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(max(8, len(rows) * 0.6), 8), sharex=True)
+            ax1.bar(labels, [r['msgs_per_s'] for r in rows])
+            ax1.set_ylabel('msgs/s')
+            ax2.bar(labels, [r['p99_ms'] or 0 for r in rows], label='p99')
+            ax2.bar(labels, [r['p50_ms'] or 0 for r in rows], label='p50')
+            ax2.set_ylabel('latency (ms)')
+            ax2.legend()
+            ax2.tick_params(axis='x', rotation=60)
+            fig.tight_layout()
+            png_path = os.path.join(out_dir, f"e2e_{stamp}.png")
+            fig.savefig(png_path)
+            paths.append(png_path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end MQTT + cipher (3DES, Simeck, Skinny)")
+    parser.add_argument('--ciphers', default='3des,simeck,skinny')
+    parser.add_argument('--modes', default='cfb,ctr')
+    parser.add_argument('--sizes', default='16,64,256', help="ukuran payload (byte)")
+    parser.add_argument('--count', type=int, default=500, help="pesan per kombinasi")
+    parser.add_argument('--wire', default='binary', choices=('binary', 'base64'))
+    parser.add_argument('--engine', default='auto')
+    parser.add_argument('--rate', type=float, default=0, help="msgs/s saat kirim, 0 = secepat mungkin")
+    parser.add_argument('--coalesce-ms', type=float, default=0)
+    parser.add_argument('--coalesce-bytes', type=int, default=1024)
+    parser.add_argument('--broker', default='loopback', help="loopback atau host:port broker lain")
+    parser.add_argument('--out', default='results')
+    parser.add_argument('--plot', action='store_true')
+    args = parser.parse_args()
+
+    local_broker = None
+    if args.broker == 'loopback':
+        local_broker = LocalBroker('127.0.0.1', 0).start_in_thread()
+        host, port = local_broker.host, local_broker.port
+    else:
+        host, _, port = args.broker.partition(':')
+        port = int(port or 1883)
+
+    rows = []
+    print(f"{'Cipher':<8}{'Engine':<14}{'Mode':<6}{'Size':<6}{'Msgs/s':<10}{'p50 ms':<9}{'p95 ms':<9}"
+          f"{'p99 ms':<9}{'Wire B':<8}{'CPU µs':<8}{'RSS MB':<8}")
+    for cipher in args.ciphers.split(','):
+        for mode in args.modes.split(','):
+            for size in (int(s) for s in args.sizes.split(',')):
+                row = run_case(cipher, mode, size, args.count, host, port, local_broker, args.wire, args.engine,
+                               args.coalesce_ms, args.coalesce_bytes, args.rate)
+                rows.append(row)
+                wire = row['wire_bytes_per_msg'] or row['payload_bytes_per_msg']
+                print(f"{cipher:<8}{row['engine']:<14}{mode:<6}{size:<6}{row['msgs_per_s']:<10.0f}"
+                      f"{row['p50_ms'] or 0:<9.2f}{row['p95_ms'] or 0:<9.2f}{row['p99_ms'] or 0:<9.2f}"
+                      f"{wire:<8.1f}{row['cpu_us_per_msg']:<8.0f}{row['rss_peak_mb'] or 0:<8.1f}")
+                if row['received'] < row['count']:
+                    print(f"   ⚠️ hanya {row['received']}/{row['count']} pesan diterima")
+
+    for path in write_results(rows, args.out, args.plot):
+        print(f"💾 {path}")
+    if local_broker is not None:
+        local_broker.stop()
+
+if __name__ == "__main__":
+    main()
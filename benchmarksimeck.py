@@ -1,100 +1,68 @@
-import time
-import base64
-import random
-from Crypto.Random import get_random_bytes
-
-# --- Simeck Cipher CFB Mode ---
-class SimeckCFB:
-    def __init__(self, key: bytes, iv: bytes):
-        self.rounds = 32
-        self.block_size = 8  # 64-bit
-        self.key = key
-        self.iv = iv
-
-    def rol(self, x, r):
-        return ((x << r) | (x >> (32 - r))) & 0xFFFFFFFF
-
-    def ror(self, x, r):
-        return ((x >> r) | (x << (32 - r))) & 0xFFFFFFFF
-
-    def simeck_encrypt(self, block: int, key: int) -> int:
-        left = (block >> 32) & 0xFFFFFFFF
-        right = block & 0xFFFFFFFF
-
-        for _ in range(self.rounds):
-            tmp = left
-            left = right ^ (self.rol(left, 1) & self.rol(left, 8)) ^ self.rol(left, 2) ^ key
-            right = tmp
-
-        return ((left << 32) | right) & 0xFFFFFFFFFFFFFFFF
-
-    def encrypt(self, plaintext: str) -> str:
-        ciphertext = b''
-        prev = int.from_bytes(self.iv, 'big')
-        key_int = int.from_bytes(self.key[:8], 'big')  # 64-bit key
-        plaintext_bytes = plaintext.encode()
-
-        for byte in plaintext_bytes:
-            keystream = self.simeck_encrypt(prev, key_int)
-            ct_byte = byte ^ ((keystream >> 56) & 0xFF)
-            ciphertext += bytes([ct_byte])
-            prev = ((prev << 8) | ct_byte) & 0xFFFFFFFFFFFFFFFF
-
-        return base64.b64encode(ciphertext).decode()
-
-    def decrypt(self, ciphertext_b64: str) -> str:
-        ciphertext = base64.b64decode(ciphertext_b64)
-        plaintext = b''
-        prev = int.from_bytes(self.iv, 'big')
-        key_int = int.from_bytes(self.key[:8], 'big')
-
-        for byte in ciphertext:
-            keystream = self.simeck_encrypt(prev, key_int)
-            pt_byte = byte ^ ((keystream >> 56) & 0xFF)
-            plaintext += bytes([pt_byte])
-            prev = ((prev << 8) | byte) & 0xFFFFFFFFFFFFFFFF
-
-        return plaintext.decode()
+import os, sys
+from benchmark import main, measure
+from modes import scalar_keystream
+from simeck import np, SIMECK_TEST_VECTORS, SIMECK_VARIANTS, Simeck, Simeck64_128, SimeckBatch, SimeckSWAR
 
 # --- Benchmark Function ---
-def benchmark_simeck_computation():
-    key_sizes = [8, 16, 24]  # bytes (64-bit, 128-bit, 192-bit)
-    plaintext_sizes = [50, 100, 150, 200, 250]
-    sample_size = 100
-
-    print(f"{'Key Size':<10}{'Plaintext Size':<16}{'Enc Delay (ms)':<16}{'Dec Delay (ms)':<16}")
-
-    for key_size in key_sizes:
-        key = get_random_bytes(key_size)
-        iv = get_random_bytes(8)
-
-        for pt_len in plaintext_sizes:
-            total_enc = 0
-            total_dec = 0
-
-            for _ in range(sample_size):
-                message = ''.join(random.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890', k=pt_len))
-                cipher = SimeckCFB(key, iv)
-
-                # Encryption timing
-                start_enc = time.time()
-                encrypted = cipher.encrypt(message)
-                end_enc = time.time()
-
-                # Decryption timing
-                start_dec = time.time()
-                decrypted = cipher.decrypt(encrypted)
-                end_dec = time.time()
-
-                assert decrypted == message, "Decryption failed"
-
-                total_enc += (end_enc - start_enc)
-                total_dec += (end_dec - start_dec)
-
-            avg_enc = (total_enc / sample_size) * 1000  # ms
-            avg_dec = (total_dec / sample_size) * 1000  # ms
-            print(f"{key_size*8:<10}{pt_len:<16}{avg_enc:<16.3f}{avg_dec:<16.3f}")
+# Simeck diukur lewat harness bersama (benchmark.py): perf_counter_ns,
+# warmup, median/persentil, setup vs biaya per byte, JSON dan baseline.
+# Argumen tambahan diteruskan ke harness, mis.:
+#   python benchmarksimeck.py --json results/simeck.json --baseline results/simeck_baseline.json
+def benchmark_simeck_computation(argv=None):
+    return main(['--ciphers', 'simeck', '--sizes', '50,100,150,200,250'] + list(argv or []))
+
+# --- Engine per parameter set vs kelas generik ---
+#   python benchmarksimeck.py --variants
+def benchmark_simeck_variants(warmup=3, repeat=15, min_time_ns=5e6):
+    print(f"{'Simeck':<10}{'Vector':<8}{'Generic µs':<12}{'Fixed µs':<10}{'Speedup':<9}"
+          f"{'KS generic µs':<15}{'KS fixed µs':<12}")
+    for params, (key, plaintext, ciphertext) in SIMECK_TEST_VECTORS.items():
+        generic = Simeck(*params, key)
+        fixed = SIMECK_VARIANTS[params](key)
+        ok = generic.encrypt(plaintext) == fixed.encrypt(plaintext) == ciphertext
+        enc_generic = measure(lambda: generic.encrypt(plaintext), warmup, repeat, min_time_ns)["median_ns"]
+        enc_fixed = measure(lambda: fixed.encrypt(plaintext), warmup, repeat, min_time_ns)["median_ns"]
+        ks_generic = measure(lambda: Simeck(*params, key), warmup, repeat, min_time_ns)["median_ns"]
+        ks_fixed = measure(lambda: SIMECK_VARIANTS[params](key), warmup, repeat, min_time_ns)["median_ns"]
+        print(f"{params[0]}/{params[1]:<7}{'✅' if ok else '❌':<7}{enc_generic / 1e3:<12.2f}{enc_fixed / 1e3:<10.2f}"
+              f"{enc_generic / enc_fixed:<9.1f}{ks_generic / 1e3:<15.2f}{ks_fixed / 1e3:<12.2f}")
+        if not ok:
+            return 1
+    return 0
+
+# --- Keystream SWAR vs scalar (dan NumPy bila ada) per jumlah blok ---
+#   python benchmarksimeck.py --swar
+def benchmark_simeck_swar(block_counts=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096), warmup=2, repeat=7,
+                          min_time_ns=5e6):
+    simeck = Simeck64_128(int.from_bytes(os.urandom(16), 'big'))
+    swar = SimeckSWAR(simeck)
+    batch = SimeckBatch(simeck) if np is not None else None
+    counter = int.from_bytes(os.urandom(8), 'big') >> 1
+    print(f"{'Blocks':<8}{'Scalar µs/blk':<15}{'SWAR µs/blk':<13}{'NumPy µs/blk':<14}{'SWAR speedup':<12}")
+    crossover_scalar = crossover_numpy = None
+    for n in block_counts:
+        if swar.keystream(counter, n) != scalar_keystream(simeck.encrypt, counter, n):
+            print(f"❌ Keystream SWAR berbeda dengan scalar ({n} blok)")
+            return 1
+        scalar = measure(lambda: scalar_keystream(simeck.encrypt, counter, n), warmup, repeat, min_time_ns)
+        packed = measure(lambda: swar.keystream(counter, n), warmup, repeat, min_time_ns)
+        scalar_ns, swar_ns = scalar["median_ns"] / n, packed["median_ns"] / n
+        numpy_ns = measure(lambda: batch.keystream(counter, n), warmup, repeat, min_time_ns)["median_ns"] / n \
+            if batch is not None else None
+        if crossover_scalar is None and swar_ns < scalar_ns:
+            crossover_scalar = n
+        if numpy_ns is not None and crossover_numpy is None and numpy_ns < swar_ns:
+            crossover_numpy = n
+        numpy_text = f"{numpy_ns / 1e3:.2f}" if numpy_ns is not None else "-"
+        print(f"{n:<8}{scalar_ns / 1e3:<15.2f}{swar_ns / 1e3:<13.2f}{numpy_text:<14}{scalar_ns / swar_ns:<12.1f}")
+    print(f"⚖️ SWAR lebih cepat dari scalar mulai {crossover_scalar} blok"
+          + (f"; NumPy menyusul SWAR mulai {crossover_numpy} blok" if crossover_numpy else ""))
+    return 0
 
 # --- Run Benchmark ---
 if __name__ == "__main__":
-    benchmark_simeck_computation()
+    if '--variants' in sys.argv[1:]:
+        sys.exit(benchmark_simeck_variants())
+    if '--swar' in sys.argv[1:]:
+        sys.exit(benchmark_simeck_swar())
+    sys.exit(benchmark_simeck_computation(sys.argv[1:]))
@@ -0,0 +1,110 @@
+import os, time
+from concurrent.futures import ProcessPoolExecutor
+from backends import ENGINES, KEY_GENERATORS, CipherBackend, create_backend
+from modes import DEFAULT_SEGMENT_SIZE
+from sessionkey import reserve_nonce, session_nonce_path
+
+# =======================
+#  Bulk Encryption Section
+# =======================
+# Simeck/Skinny murni Python memegang GIL, jadi batch pesan dibagi ke
+# beberapa proses. Tiap worker membuat satu CipherBackend saat start
+# (seperti _init_cipher_worker di aioapp.py), jadi format payload sama
+# persis dengan aplikasi: hasil pool bisa didekripsi backend aplikasi dan
+# sebaliknya. Engine 'auto' dipilih sekali di proses utama, dan key schedule
+# diekspansi sekali di sana lalu dikirim ke worker (Engine.from_round_keys),
+# jadi worker tidak menghitung ulang round key dari key mentah. Di mode CTR
+# tiap worker mengambil nonce dari file counter (default: counter key sesi),
+# jadi worker pool dan backend aplikasi tidak memakai nonce yang sama.
+CIPHERS = tuple(KEY_GENERATORS)
+
+_worker_backend = None
+
+def _init_worker(cipher, round_keys, iv, engine, mode, segment_size, wire, nonce_path):
+    global _worker_backend
+    _worker_backend = CipherBackend(cipher, ENGINES[cipher][engine].from_round_keys(round_keys), iv, mode,
+                                    segment_size, pool_depth=0, wire=wire,
+                                    nonce=reserve_nonce(nonce_path) if mode == 'ctr' else None)
+
+def _run_chunk(decrypt, messages):
+    start = time.perf_counter()
+    fn = _worker_backend.decrypt_message if decrypt else _worker_backend.encrypt_message
+    results = [fn(m) for m in messages]
+    elapsed = time.perf_counter() - start
+    nbytes = sum(len(m) for m in messages)
+    return os.getpid(), results, nbytes, elapsed
+
+class BulkCipherPool:
+    def __init__(self, cipher: str, key, iv: bytes, workers=None, chunk_size=64, segment_size=DEFAULT_SEGMENT_SIZE,
+                 engine='auto', mode='cfb', wire='binary', nonce_path=None):
+        if cipher not in KEY_GENERATORS:
+            raise ValueError(f"Cipher tidak dikenal: {cipher}")
+        self.cipher = cipher
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._stats = {}
+        backend = create_backend(cipher, key, iv, engine=engine, mode=mode, segment_size=segment_size, pool_depth=0)
+        self.engine = backend.engine.name
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(cipher, backend.engine.round_keys, iv, self.engine, mode, segment_size, wire,
+                      nonce_path or session_nonce_path()),
+        )
+
+    def _map(self, decrypt, messages):
+        futures = [self._executor.submit(_run_chunk, decrypt, messages[i:i + self.chunk_size])
+                   for i in range(0, len(messages), self.chunk_size)]
+        results = []
+        for future in futures:
+            pid, chunk_results, nbytes, elapsed = future.result()
+            results.extend(chunk_results)
+            stat = self._stats.setdefault(pid, {"messages": 0, "bytes": 0, "seconds": 0.0})
+            stat["messages"] += len(chunk_results)
+            stat["bytes"] += nbytes
+            stat["seconds"] += elapsed
+        return results
+
+    def encrypt_many(self, messages) -> list:
+        return self._map(False, list(messages))
+
+    def decrypt_many(self, payloads) -> list:
+        return self._map(True, list(payloads))
+
+    def stats(self):
+        # Throughput per worker (pid) dihitung dari waktu kerja di worker itu sendiri
+        return {
+            pid: dict(stat,
+                      msgs_per_s=stat["messages"] / stat["seconds"] if stat["seconds"] else 0.0,
+                      bytes_per_s=stat["bytes"] / stat["seconds"] if stat["seconds"] else 0.0)
+            for pid, stat in self._stats.items()
+        }
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# --- Demo skala worker ---
+if __name__ == "__main__":
+    from simeck import generate_simeck_key_iv
+
+    key, iv = generate_simeck_key_iv()
+    messages = [f"{20 + i % 150 / 10:.1f}" * 8 for i in range(20000)]
+    chunk_size = int(os.environ.get('BULK_CHUNK_SIZE', 256))
+
+    print(f"{'Workers':<10}{'Msgs/s':<14}{'Speedup':<10}")
+    baseline = None
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        with BulkCipherPool('simeck', key, iv, workers=workers, chunk_size=chunk_size) as pool:
+            pool.encrypt_many(messages[:workers * chunk_size])  # warmup worker
+            start = time.perf_counter()
+            encrypted = pool.encrypt_many(messages)
+            rate = len(messages) / (time.perf_counter() - start)
+            assert pool.decrypt_many(encrypted[:100]) == messages[:100]
+        baseline = baseline or rate
+        print(f"{workers:<10}{rate:<14.0f}{rate / baseline:<10.2f}")
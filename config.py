@@ -0,0 +1,89 @@
+import os
+from backends import KEY_GENERATORS, create_backend
+from sessionkey import load_session_key, session_nonce
+from modes import DEFAULT_SEGMENT_SIZE
+
+# =======================
+#  Konfigurasi Section
+# =======================
+# Konfigurasi bersama untuk runtime Flask (appmqtt.py) dan asyncio
+# (aioapp.py), semuanya lewat environment variable.
+broker = os.environ.get('MQTT_BROKER', 'broker.emqx.io')
+port = int(os.environ.get('MQTT_PORT', 1883))
+# MQTT_BROKER=loopback: broker MQTT lokal dijalankan di proses ini (tanpa
+# internet, tanpa jitter broker publik); MQTT_PORT=0 memilih port bebas
+local_broker = None
+if broker == 'loopback':
+    from localbroker import LocalBroker
+    local_broker = LocalBroker('127.0.0.1', int(os.environ.get('MQTT_PORT', 0))).start_in_thread()
+    broker, port = local_broker.host, local_broker.port
+topic = os.environ.get('MQTT_TOPIC', "suhu/secure")
+qos = int(os.environ.get('MQTT_QOS', 1))
+# Level protokol MQTT: 4 = 3.1.1 (default), 5 = MQTT v5 (sama dengan konstanta paho)
+mqtt_protocol = 5 if os.environ.get('MQTT_PROTOCOL', '3.1.1') in ('5', '5.0', 'v5') else 4
+publish_timeout = float(os.environ.get('MQTT_PUBLISH_TIMEOUT', 5.0))
+max_inflight = int(os.environ.get('MQTT_MAX_INFLIGHT', 1000))
+batch_max_items = int(os.environ.get('BATCH_MAX_ITEMS', 1000))
+# Coalescing publisher: 0 = tiap pembacaan satu pesan MQTT
+coalesce_window_ms = float(os.environ.get('COALESCE_WINDOW_MS', 0))
+coalesce_max_bytes = int(os.environ.get('COALESCE_MAX_BYTES', 1024))
+# Endpoint /admin/* hanya aktif jika ADMIN_TOKEN diisi (header X-Admin-Token)
+admin_token = os.environ.get('ADMIN_TOKEN')
+
+# Satu aplikasi untuk semua cipher, dipilih lewat konfigurasi:
+#   CIPHER        = 3des | simeck | skinny
+#   CIPHER_ENGINE = auto (micro-benchmark saat start) atau nama engine
+#   CIPHER_MODE   = cfb | ctr
+#   PAYLOAD_SIZE  = ukuran payload (byte) untuk pemilihan engine
+#   MQTT_PAYLOAD_FORMAT = binary (envelope, IV per pesan) | base64 (format lama)
+cipher = os.environ.get('CIPHER', '3des')
+cipher_engine = os.environ.get('CIPHER_ENGINE', 'auto')
+cipher_mode = os.environ.get('CIPHER_MODE', 'cfb')
+payload_format = os.environ.get('MQTT_PAYLOAD_FORMAT', 'binary')
+payload_size = int(os.environ.get('PAYLOAD_SIZE', 16))
+if cipher not in KEY_GENERATORS:
+    raise SystemExit(f"CIPHER tidak dikenal: {cipher} (pilih: {', '.join(KEY_GENERATORS)})")
+
+# Client ID unik per proses: beberapa worker bisa terhubung bersamaan
+subscriber_client_id = f'subscriber-{cipher}-{os.getpid()}'
+publisher_client_id = f'publisher-{cipher}'
+
+# Kunci tetap selama runtime; dibagi antar worker lewat KEY_SHM / KEY_FILE
+key, iv = load_session_key(cipher)
+backend = create_backend(
+    cipher, key, iv,
+    engine=cipher_engine,
+    mode=cipher_mode,
+    segment_size=DEFAULT_SEGMENT_SIZE,
+    payload_size=payload_size,
+    pool_depth=int(os.environ.get('CTR_POOL_DEPTH', 1024)),
+    refill_chunk=int(os.environ.get('CTR_REFILL_CHUNK', 128)),
+    wire=payload_format,
+    nonce=session_nonce() if cipher_mode == 'ctr' else None,
+).start()
+
+# Opsional: key per perangkat (KEYSTORE_PATH = file SQLite). Pesan di
+# topik <MQTT_TOPIC>/<device_id> memakai key perangkat itu; topik dasar
+# tetap memakai key sesi di atas.
+keystore = None
+if os.environ.get('KEYSTORE_PATH'):
+    from keystore import KeyStore
+    keystore = KeyStore(
+        os.environ['KEYSTORE_PATH'],
+        mode=cipher_mode,
+        wire=payload_format,
+        cache_size=int(os.environ.get('KEYSTORE_CACHE_SIZE', 1024)),
+        refresh_interval=float(os.environ.get('KEYSTORE_REFRESH_SECONDS', 1.0)),
+    ).register_metrics()
+
+# Subscriber horizontal: MQTT_SHARE_GROUP=<grup> berlangganan lewat shared
+# subscription $share/<grup>/<filter>, jadi broker membagi pesan ke semua
+# proses subscriber di grup itu (bukan menggandakannya).
+#   MQTT_SUBSCRIBE_TOPIC = filter, default MQTT_TOPIC/# (topik dasar dan seluruh
+#                          pohon <site>/<device> di bawahnya), mis. suhu/+/+
+#   MQTT_SHARD_DEPTH     = jumlah level topik yang menjadi nama shard untuk
+#                          statistik throughput (default satu level di bawah MQTT_TOPIC)
+share_group = os.environ.get('MQTT_SHARE_GROUP')
+subscribe_topic = os.environ.get('MQTT_SUBSCRIBE_TOPIC') or f"{topic}/#"
+subscription = f"$share/{share_group}/{subscribe_topic}" if share_group else subscribe_topic
+shard_depth = int(os.environ.get('MQTT_SHARD_DEPTH', topic.count('/') + 2))
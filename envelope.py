@@ -0,0 +1,35 @@
+import struct
+
+# =======================
+#  Envelope Section
+# =======================
+# Format biner pesan MQTT (tanpa base64):
+#   [tag:1][cipher_id:1][mode:1][nonce:8][ciphertext...]
+# tag = 0xE0 | versi; byte >= 0x80 tidak pernah muncul di teks base64,
+# jadi subscriber bisa membedakan envelope dari payload lama. mode memakai
+# flag yang sama dengan payload lama (8/64 = CFB, 0xC0 = CTR). nonce adalah
+# IV per pesan untuk CFB atau counter awal untuk CTR.
+ENVELOPE_VERSION = 1
+ENVELOPE_TAG = 0xE0 | ENVELOPE_VERSION
+HEADER = struct.Struct('>BBB8s')
+WIRE_FORMATS = ('binary', 'base64')
+
+CIPHER_IDS = {'simeck': 1, 'skinny': 2, '3des': 3}
+
+def is_envelope(payload) -> bool:
+    return not isinstance(payload, str) and len(payload) > 0 and payload[0] & 0xF0 == 0xE0
+
+def new_envelope(cipher_id: int, mode: int, nonce: bytes, size: int):
+    # Header ditulis langsung; ciphertext diisi engine lewat memoryview body
+    payload = bytearray(HEADER.size + size)
+    HEADER.pack_into(payload, 0, ENVELOPE_TAG, cipher_id, mode, nonce)
+    return payload, memoryview(payload)[HEADER.size:]
+
+def unpack_envelope(payload):
+    view = memoryview(payload)
+    if len(view) < HEADER.size:
+        raise ValueError(f"Envelope terlalu pendek: {len(view)} byte")
+    tag, cipher_id, mode, nonce = HEADER.unpack_from(view)
+    if tag != ENVELOPE_TAG:
+        raise ValueError(f"Versi envelope tidak didukung: {tag & 0x0F}")
+    return cipher_id, mode, nonce, view[HEADER.size:]
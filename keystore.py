@@ -0,0 +1,294 @@
+import argparse, random, sqlite3, sys, threading, time
+from collections import OrderedDict
+from backends import ENGINES, KEY_GENERATORS, CipherBackend
+from metrics import REGISTRY
+from modes import DEFAULT_SEGMENT_SIZE
+from sessionkey import encode_key_material, decode_key_material
+
+# =======================
+#  Key Store Section
+# =======================
+# Satu key per perangkat (device ID = segmen terakhir topik), disimpan di
+# SQLite supaya bisa dipakai bersama beberapa worker proses. Backend cipher
+# per perangkat (key schedule Simeck/Skinny yang sudah diekspansi, objek
+# DES3) disimpan di LRU terbatas, jadi pesan berikutnya dari perangkat yang
+# sama tidak mengulang ekspansi key.
+# Rotasi key menaikkan versi perangkat dan nomor generasi global; proses
+# lain memeriksa generasi paling lambat tiap refresh_interval detik dan
+# membuang entri LRU yang basi, tanpa restart.
+# Mode CTR: backend perangkat bisa dibuat ulang berkali-kali (LRU), jadi
+# nonce counter-nya tidak diambil acak melainkan dari kolom ctr_nonce yang
+# naik monoton; tiap proses memesan NONCE_RESERVE nonce sekaligus dan
+# sisanya disimpan di memori (tidak ikut dibuang saat entri LRU dibuang).
+DEFAULT_ENGINES = {'simeck': 'swar', 'skinny': 'table', '3des': 'pycryptodome'}
+NONCE_RESERVE = 64
+NONCE_LIMIT = 1 << 32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS devices (
+    device_id TEXT PRIMARY KEY,
+    cipher TEXT NOT NULL,
+    material BLOB NOT NULL,
+    version INTEGER NOT NULL,
+    generation INTEGER NOT NULL,
+    revoked INTEGER NOT NULL DEFAULT 0,
+    ctr_nonce INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS devices_generation ON devices (generation);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta VALUES ('generation', 0);
+"""
+
+class UnknownDeviceError(KeyError):
+    pass
+
+class KeyStore:
+    def __init__(self, path, mode='cfb', wire='binary', segment_size=DEFAULT_SEGMENT_SIZE, cache_size=1024,
+                 refresh_interval=1.0, engines=None):
+        self.path = path
+        self.mode = mode
+        self.wire = wire
+        self.segment_size = segment_size
+        self.cache_size = cache_size
+        self.refresh_interval = refresh_interval
+        self.engines = dict(DEFAULT_ENGINES, **(engines or {}))
+        self._local = threading.local()
+        self._cache = OrderedDict()  # device_id -> CipherBackend
+        self._nonces = {}  # device_id -> [nonce berikutnya, batas pesanan]
+        self._epoch = 0  # naik tiap invalidasi; backend yang dibuat sebelumnya tidak di-cache
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.rotations = 0
+        self._db().executescript(SCHEMA)
+        columns = [row[1] for row in self._db().execute("PRAGMA table_info(devices)")]
+        if 'ctr_nonce' not in columns:  # database dari versi sebelum kolom ini ada
+            self._db().execute("ALTER TABLE devices ADD COLUMN ctr_nonce INTEGER NOT NULL DEFAULT 0")
+        self._generation = self._read_generation()
+        self._checked_at = time.monotonic()
+
+    def register_metrics(self, registry=REGISTRY):
+        registry.counter_fn('keystore_cache_hits_total', "Backend perangkat ditemukan di LRU", lambda: self.hits)
+        registry.counter_fn('keystore_cache_misses_total', "Backend perangkat dibuat ulang (ekspansi key)",
+                            lambda: self.misses)
+        registry.counter_fn('keystore_cache_evictions_total', "Entri LRU dibuang karena penuh", lambda: self.evictions)
+        registry.counter_fn('keystore_invalidations_total', "Entri LRU dibuang karena key dirotasi",
+                            lambda: self.invalidations)
+        registry.gauge_fn('keystore_cache_size', "Jumlah backend perangkat di LRU", lambda: len(self._cache))
+        return self
+
+    def _db(self):
+        # Satu koneksi per thread; WAL supaya pembaca di proses lain tidak terblokir
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _read_generation(self) -> int:
+        return self._db().execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()[0]
+
+    def _write(self, device_id, cipher, key, iv, insert=False) -> int:
+        material = encode_key_material(cipher, key, iv)
+        with self._db() as db:
+            db.execute("UPDATE meta SET value = value + 1 WHERE name = 'generation'")
+            generation = db.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()[0]
+            if insert:
+                db.execute("INSERT INTO devices (device_id, cipher, material, version, generation) VALUES (?, ?, ?, 1, ?)",
+                           (device_id, cipher, material, generation))
+                version = 1
+            else:
+                db.execute("UPDATE devices SET material = ?, version = version + 1, generation = ?, revoked = 0 "
+                           "WHERE device_id = ?", (material, generation, device_id))
+                version = db.execute("SELECT version FROM devices WHERE device_id = ?", (device_id,)).fetchone()[0]
+        self._invalidate([device_id])
+        return version
+
+    # --- Administrasi perangkat ---
+    def add_device(self, device_id: str, cipher: str, key=None, iv=None) -> int:
+        if cipher not in KEY_GENERATORS:
+            raise ValueError(f"Cipher tidak dikenal: {cipher}")
+        if key is None:
+            key, iv = KEY_GENERATORS[cipher]()
+        try:
+            return self._write(device_id, cipher, key, iv, insert=True)
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Perangkat sudah terdaftar: {device_id}") from None
+
+    def rotate(self, device_id: str) -> int:
+        # Key baru dengan cipher yang sama; versi naik, LRU semua proses dibuang
+        row = self._db().execute("SELECT cipher FROM devices WHERE device_id = ?", (device_id,)).fetchone()
+        if row is None:
+            raise UnknownDeviceError(device_id)
+        version = self._write(device_id, row[0], *KEY_GENERATORS[row[0]]())
+        self.rotations += 1
+        return version
+
+    def revoke(self, device_id: str):
+        with self._db() as db:
+            db.execute("UPDATE meta SET value = value + 1 WHERE name = 'generation'")
+            updated = db.execute("UPDATE devices SET revoked = 1, generation = "
+                                 "(SELECT value FROM meta WHERE name = 'generation') WHERE device_id = ?",
+                                 (device_id,)).rowcount
+        if not updated:
+            raise UnknownDeviceError(device_id)
+        self._invalidate([device_id])
+
+    def devices(self) -> list:
+        rows = self._db().execute("SELECT device_id, cipher, version, revoked FROM devices ORDER BY device_id")
+        return [{"device_id": d, "cipher": c, "version": v, "revoked": bool(r)} for d, c, v, r in rows]
+
+    # --- Backend per perangkat (LRU) ---
+    def _invalidate(self, device_ids):
+        with self._lock:
+            if device_ids:
+                self._epoch += 1
+            for device_id in device_ids:
+                if self._cache.pop(device_id, None) is not None:
+                    self.invalidations += 1
+
+    def refresh(self):
+        # Buang entri yang key-nya dirotasi/dicabut oleh proses lain
+        self._checked_at = time.monotonic()
+        generation = self._read_generation()
+        if generation == self._generation:
+            return
+        rows = self._db().execute("SELECT device_id FROM devices WHERE generation > ?", (self._generation,))
+        self._invalidate([row[0] for row in rows])
+        self._generation = generation
+
+    def _ctr_nonce(self, device_id: str) -> int:
+        with self._lock:
+            reserved = self._nonces.get(device_id)
+            if reserved is not None and reserved[0] < reserved[1]:
+                reserved[0] += 1
+                return reserved[0] - 1
+        # Pesan blok nonce baru; UPDATE + SELECT dalam satu transaksi tulis SQLite
+        with self._db() as db:
+            db.execute("UPDATE devices SET ctr_nonce = ctr_nonce + ? WHERE device_id = ?", (NONCE_RESERVE, device_id))
+            end = db.execute("SELECT ctr_nonce FROM devices WHERE device_id = ?", (device_id,)).fetchone()[0]
+        if end > NONCE_LIMIT:
+            raise ValueError(f"Nonce CTR perangkat {device_id} habis, rotasi key perangkat ini")
+        with self._lock:
+            self._nonces[device_id] = [end - NONCE_RESERVE + 1, end]
+        return end - NONCE_RESERVE
+
+    def backend(self, device_id: str) -> CipherBackend:
+        if time.monotonic() - self._checked_at >= self.refresh_interval:
+            self.refresh()
+        with self._lock:
+            backend = self._cache.get(device_id)
+            if backend is not None:
+                self._cache.move_to_end(device_id)
+                self.hits += 1
+                return backend
+            self.misses += 1
+            epoch = self._epoch
+
+        row = self._db().execute("SELECT cipher, material FROM devices WHERE device_id = ? AND revoked = 0",
+                                 (device_id,)).fetchone()
+        if row is None:
+            raise UnknownDeviceError(device_id)
+        cipher, material = row
+        key, iv = decode_key_material(material, cipher)
+        # Tanpa thread pool keystream: ribuan perangkat, keystream CTR dihitung saat dipakai
+        backend = CipherBackend(cipher, ENGINES[cipher][self.engines[cipher]](key), iv, self.mode, self.segment_size,
+                                pool_depth=0, wire=self.wire,
+                                nonce=self._ctr_nonce(device_id) if self.mode == 'ctr' else None)
+        with self._lock:
+            if epoch != self._epoch:
+                # Ada rotasi/pencabutan selama key dibaca: jangan simpan backend yang mungkin basi
+                return backend
+            self._cache[device_id] = backend
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        return backend
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "size": len(self._cache),
+                "maxsize": self.cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "rotations": self.rotations,
+                "generation": self._generation,
+            }
+
+def device_from_topic(topic: str) -> str:
+    return topic.rsplit('/', 1)[-1]
+
+# --- CLI: administrasi dan benchmark LRU ---
+#   python keystore.py keys.db add sensor-1 simeck
+#   python keystore.py keys.db rotate sensor-1
+#   python keystore.py keys.db list
+#   python keystore.py keys.db bench --devices 10000 --cache-size 1024
+def bench(store, cipher, devices, messages, hot_fraction):
+    existing = {d["device_id"] for d in store.devices()}
+    ids = [f"bench-{cipher}-{i}" for i in range(devices)]
+    for device_id in ids:
+        if device_id not in existing:
+            store.add_device(device_id, cipher)
+    # Trafik miring: 80% pesan dari hot_fraction perangkat
+    hot = ids[:max(1, int(devices * hot_fraction))]
+    picks = [random.choice(hot) if random.random() < 0.8 else random.choice(ids) for _ in range(messages)]
+    payloads = {device_id: store.backend(device_id).encrypt_message("23.5") for device_id in set(picks)}
+    for name, size in (("tanpa cache", 0), ("LRU", store.cache_size)):
+        probe = KeyStore(store.path, store.mode, store.wire, store.segment_size, cache_size=size)
+        start = time.perf_counter()
+        for device_id in picks:
+            assert probe.backend(device_id).decrypt_message(payloads[device_id]) == "23.5"
+        elapsed = time.perf_counter() - start
+        stats = probe.stats()
+        print(f"{name:<12}{elapsed / messages * 1e6:>8.1f} µs/pesan  hit rate {stats['hit_rate'] or 0:.1%}  "
+              f"evictions {stats['evictions']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Key store per perangkat (SQLite)")
+    parser.add_argument('path')
+    sub = parser.add_subparsers(dest='command', required=True)
+    add = sub.add_parser('add')
+    add.add_argument('device_id')
+    add.add_argument('cipher', choices=sorted(KEY_GENERATORS))
+    sub.add_parser('rotate').add_argument('device_id')
+    sub.add_parser('revoke').add_argument('device_id')
+    sub.add_parser('list')
+    run = sub.add_parser('bench')
+    run.add_argument('--cipher', default='simeck', choices=sorted(KEY_GENERATORS))
+    run.add_argument('--mode', default='cfb', choices=('cfb', 'ctr'))
+    run.add_argument('--devices', type=int, default=10000)
+    run.add_argument('--messages', type=int, default=20000)
+    run.add_argument('--cache-size', type=int, default=1024)
+    run.add_argument('--hot-fraction', type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    store = KeyStore(args.path, mode=getattr(args, 'mode', 'cfb'), cache_size=getattr(args, 'cache_size', 1024))
+    try:
+        if args.command == 'add':
+            print(f"✅ {args.device_id} versi {store.add_device(args.device_id, args.cipher)}")
+        elif args.command == 'rotate':
+            print(f"🔄 {args.device_id} versi {store.rotate(args.device_id)}")
+        elif args.command == 'revoke':
+            store.revoke(args.device_id)
+            print(f"🚫 {args.device_id} dicabut")
+        elif args.command == 'list':
+            for device in store.devices():
+                print(f"{device['device_id']:<24}{device['cipher']:<8}v{device['version']}"
+                      f"{'  (dicabut)' if device['revoked'] else ''}")
+        else:
+            bench(store, args.cipher, args.devices, args.messages, args.hot_fraction)
+    except (ValueError, UnknownDeviceError) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+import asyncio, os, sys, struct, threading, time
+
+# =======================
+#  Local Broker Section
+# =======================
+# Broker MQTT 3.1.1/5 minimal untuk uji/benchmark end-to-end tanpa internet.
+# Publisher/subscriber paho tetap sama, cukup diarahkan ke host:port ini
+# (MQTT_BROKER=loopback menjalankannya di dalam proses aplikasi).
+# Didukung: CONNECT, PUBLISH QoS 0/1/2, SUBSCRIBE/UNSUBSCRIBE dengan
+# wildcard + dan #, shared subscription $share/<grup>/<filter>, PINGREQ,
+# DISCONNECT. Properti MQTT v5 dibaca lalu diabaikan (tanpa topic alias,
+# No Local, maupun session expiry). Tidak ada retained message, session
+# persisten, maupun autentikasi; QoS 2 diteruskan sebagai QoS 1.
+CONNECT, CONNACK, PUBLISH, PUBACK, PUBREC, PUBREL, PUBCOMP = 1, 2, 3, 4, 5, 6, 7
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK, PINGREQ, PINGRESP, DISCONNECT = 8, 9, 10, 11, 12, 13, 14
+
+MAX_WRITE_BUFFER = 1 << 20  # tunggu subscriber lambat jika buffer kirimnya melebihi ini
+MQTT_V5 = 5
+SHARE_PREFIX = '$share/'
+# Reason code SUBACK/UNSUBACK
+INVALID_FILTER_V311, INVALID_FILTER_V5, NO_SUBSCRIPTION_V5 = 0x80, 0x8F, 0x11
+
+def encode_length(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte, n = n & 0x7F, n >> 7
+        out.append(byte | 0x80 if n else byte)
+        if not n:
+            return bytes(out)
+
+def encode_packet(packet_type: int, flags: int, body: bytes) -> bytes:
+    return bytes([packet_type << 4 | flags]) + encode_length(len(body)) + body
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    if topic.startswith('$') and not topic_filter.startswith('$'):
+        return False
+    filter_levels, topic_levels = topic_filter.split('/'), topic.split('/')
+    for i, level in enumerate(filter_levels):
+        if level == '#':
+            return True
+        if i >= len(topic_levels) or (level != '+' and level != topic_levels[i]):
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+def decode_length(data: bytes, offset: int):
+    # Variable byte integer (panjang properti v5); kembali (nilai, offset setelahnya)
+    value, shift = 0, 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+def skip_properties(data: bytes, offset: int) -> int:
+    length, offset = decode_length(data, offset)
+    return offset + length
+
+def parse_share(topic_filter: str):
+    # $share/<grup>/<filter> -> (grup, filter); None jika bukan shared subscription
+    if not topic_filter.startswith(SHARE_PREFIX):
+        return None
+    group, _, inner = topic_filter[len(SHARE_PREFIX):].partition('/')
+    if not group or not inner or '+' in group or '#' in group:
+        raise ValueError(f"Shared subscription tidak valid: {topic_filter}")
+    return group, inner
+
+async def read_packet(reader):
+    first = (await reader.readexactly(1))[0]
+    length, shift = 0, 0
+    while True:
+        byte = (await reader.readexactly(1))[0]
+        length |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            break
+        shift += 7
+    return first >> 4, first & 0x0F, await reader.readexactly(length) if length else b''
+
+class _Session:
+    def __init__(self, writer):
+        self.writer = writer
+        self.client_id = None
+        self.protocol = 4
+        self.subscriptions = {}
+        self.shares = set()  # key $share/<grup>/<filter> yang diikuti session ini
+        self._mid = 0
+
+    def next_mid(self) -> int:
+        self._mid = self._mid % 0xFFFF + 1
+        return self._mid
+
+    def send(self, data: bytes):
+        self.writer.write(data)
+
+    def congested(self) -> bool:
+        return self.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER
+
+class _ShareGroup:
+    # Satu pesan ke satu anggota grup, bergiliran (round-robin); anggota yang
+    # buffer kirimnya penuh dilewati selama masih ada anggota lain
+    def __init__(self, group, topic_filter):
+        self.group = group
+        self.topic_filter = topic_filter
+        self.members = {}  # session -> QoS, urutan masuk = urutan giliran
+        self.delivered = {}  # client id -> jumlah pesan
+        self._next = 0
+
+    def pick(self):
+        members = list(self.members)
+        for i in range(len(members)):
+            session = members[(self._next + i) % len(members)]
+            if not session.congested() or i == len(members) - 1:
+                self._next = (self._next + i + 1) % len(members)
+                self.delivered[session.client_id] = self.delivered.get(session.client_id, 0) + 1
+                return session, self.members[session]
+        return None, None
+
+class LocalBroker:
+    def __init__(self, host='127.0.0.1', port=1883):
+        self.host = host
+        self.port = port
+        self.sessions = {}
+        self.share_groups = {}  # $share/<grup>/<filter> -> _ShareGroup
+        self.connections = 0
+        self.messages_in = 0
+        self.messages_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._server = None
+        self._loop = None
+        self._thread = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start_in_thread(self):
+        # Event loop broker di thread sendiri; kembali setelah port siap dipakai
+        ready, errors = threading.Event(), []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(self.start())
+            except OSError as e:
+                errors.append(e)
+                ready.set()
+                return
+            ready.set()
+            self._loop.run_forever()
+            # Setelah stop(): selesaikan handler koneksi yang masih menunggu
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="local-broker", daemon=True)
+        self._thread.start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+        def close():
+            self._server.close()
+            for session in list(self.sessions.values()):
+                session.writer.close()
+            self._loop.stop()
+        self._loop.call_soon_threadsafe(close)
+        self._thread.join()
+        self._loop = None
+
+    async def _handle(self, reader, writer):
+        session = _Session(writer)
+        self.connections += 1
+        try:
+            while True:
+                packet_type, flags, body = await read_packet(reader)
+                self.bytes_in += 1 + len(encode_length(len(body))) + len(body)
+                if packet_type == CONNECT:
+                    self._on_connect(session, body)
+                elif packet_type == PUBLISH:
+                    await self._on_publish(session, flags, body)
+                elif packet_type == PUBREL:
+                    session.send(encode_packet(PUBCOMP, 0, body[:2]))
+                elif packet_type == SUBSCRIBE:
+                    self._on_subscribe(session, body)
+                elif packet_type == UNSUBSCRIBE:
+                    self._on_unsubscribe(session, body)
+                elif packet_type == PINGREQ:
+                    session.send(encode_packet(PINGRESP, 0, b''))
+                elif packet_type == DISCONNECT:
+                    break
+                # PUBACK dari subscriber tidak perlu diproses (tanpa retry)
+                if writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # CancelledError: broker dihentikan saat client masih terhubung
+            pass
+        finally:
+            if session.client_id is not None and self.sessions.get(session.client_id) is session:
+                del self.sessions[session.client_id]
+            for key in list(session.shares):
+                self._leave_share(session, key)
+            writer.close()
+
+    def _on_connect(self, session, body):
+        # Variable header: nama protokol, level, flags, keepalive; payload diawali client id
+        # (v5: diikuti properti CONNECT sebelum payload)
+        (name_len,) = struct.unpack_from('>H', body, 0)
+        session.protocol = body[2 + name_len]
+        offset = 2 + name_len + 4
+        if session.protocol == MQTT_V5:
+            offset = skip_properties(body, offset)
+        (id_len,) = struct.unpack_from('>H', body, offset)
+        client_id = body[offset + 2:offset + 2 + id_len].decode()
+        assigned = not client_id
+        client_id = client_id or f"auto-{id(session):x}"
+        old = self.sessions.get(client_id)
+        if old is not None:
+            old.writer.close()  # client id sama: koneksi lama diputus
+        session.client_id = client_id
+        self.sessions[client_id] = session
+        if session.protocol != MQTT_V5:
+            session.send(encode_packet(CONNACK, 0, b'\x00\x00'))
+            return
+        # v5: client id kosong wajib dikembalikan lewat Assigned Client Identifier (0x12)
+        properties = b''
+        if assigned:
+            properties = b'\x12' + struct.pack('>H', len(client_id)) + client_id.encode()
+        session.send(encode_packet(CONNACK, 0, b'\x00\x00' + encode_length(len(properties)) + properties))
+
+    async def _on_publish(self, session, flags, body):
+        qos = (flags >> 1) & 0x03
+        (topic_len,) = struct.unpack_from('>H', body, 0)
+        topic = body[2:2 + topic_len].decode()
+        offset = 2 + topic_len
+        if qos:
+            mid = body[offset:offset + 2]
+            offset += 2
+            session.send(encode_packet(PUBACK if qos == 1 else PUBREC, 0, mid))
+        if session.protocol == MQTT_V5:
+            offset = skip_properties(body, offset)
+        self.messages_in += 1
+        await self.route(topic, body[offset:], qos)
+
+    async def route(self, topic: str, payload: bytes, qos: int):
+        # Subscription biasa: tiap session yang cocok menerima satu salinan;
+        # shared subscription: satu anggota per grup
+        deliveries = []
+        for target in list(self.sessions.values()):
+            granted = max((q for f, q in target.subscriptions.items() if topic_matches(f, topic)), default=None)
+            if granted is not None:
+                deliveries.append((target, granted))
+        for group in list(self.share_groups.values()):
+            if group.members and topic_matches(group.topic_filter, topic):
+                deliveries.append(group.pick())
+
+        topic_bytes = topic.encode()
+        topic_header = struct.pack('>H', len(topic_bytes)) + topic_bytes
+        slow = []
+        for target, granted in deliveries:
+            out_qos = min(qos, granted, 1)
+            header = topic_header
+            if out_qos:
+                header += struct.pack('>H', target.next_mid())
+            if target.protocol == MQTT_V5:
+                header += b'\x00'  # tanpa properti
+            packet = encode_packet(PUBLISH, out_qos << 1, header + payload)
+            target.send(packet)
+            self.messages_out += 1
+            self.bytes_out += len(packet)
+            if target.congested():
+                slow.append(target.writer)
+        for writer in slow:
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    def _on_subscribe(self, session, body):
+        # v5: properti setelah packet id, byte opsi per filter (QoS di 2 bit terbawah)
+        v5 = session.protocol == MQTT_V5
+        mid, offset, granted = body[:2], skip_properties(body, 2) if v5 else 2, bytearray()
+        while offset < len(body):
+            (length,) = struct.unpack_from('>H', body, offset)
+            topic_filter = body[offset + 2:offset + 2 + length].decode()
+            qos = min(body[offset + 2 + length] & 0x03, 1)
+            offset += 3 + length
+            try:
+                share = parse_share(topic_filter)
+            except ValueError:
+                granted.append(INVALID_FILTER_V5 if v5 else INVALID_FILTER_V311)
+                continue
+            if share is None:
+                session.subscriptions[topic_filter] = qos
+            else:
+                group = self.share_groups.get(topic_filter)
+                if group is None:
+                    group = self.share_groups[topic_filter] = _ShareGroup(*share)
+                group.members[session] = qos
+                session.shares.add(topic_filter)
+            granted.append(qos)
+        session.send(encode_packet(SUBACK, 0, mid + (b'\x00' if v5 else b'') + bytes(granted)))
+
+    def _on_unsubscribe(self, session, body):
+        v5 = session.protocol == MQTT_V5
+        mid, offset, reasons = body[:2], skip_properties(body, 2) if v5 else 2, bytearray()
+        while offset < len(body):
+            (length,) = struct.unpack_from('>H', body, offset)
+            topic_filter = body[offset + 2:offset + 2 + length].decode()
+            offset += 2 + length
+            if topic_filter in session.shares:
+                self._leave_share(session, topic_filter)
+                reasons.append(0)
+            else:
+                reasons.append(0 if session.subscriptions.pop(topic_filter, None) is not None else NO_SUBSCRIPTION_V5)
+        # v3.1.1: UNSUBACK hanya packet id; v5: properti + reason code per filter
+        session.send(encode_packet(UNSUBACK, 0, mid + (b'\x00' + bytes(reasons) if v5 else b'')))
+
+    def _leave_share(self, session, key):
+        session.shares.discard(key)
+        group = self.share_groups.get(key)
+        if group is not None:
+            group.members.pop(session, None)
+            if not group.members:
+                del self.share_groups[key]
+
+    def stats(self):
+        return {
+            "host": self.host,
+            "port": self.port,
+            "clients": len(self.sessions),
+            "connections": self.connections,
+            "messages_in": self.messages_in,
+            "messages_out": self.messages_out,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "share_groups": {
+                key: {"members": len(group.members), "delivered": dict(group.delivered)}
+                for key, group in list(self.share_groups.items())
+            },
+        }
+
+# --- Jalankan sebagai broker lokal mandiri ---
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else int(os.environ.get('MQTT_PORT', 1883))
+    broker = LocalBroker(os.environ.get('MQTT_BIND', '127.0.0.1'), port).start_in_thread()
+    print(f"🚀 Broker MQTT lokal siap di mqtt://{broker.host}:{broker.port}")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"📊 {broker.stats()}")
+    except KeyboardInterrupt:
+        broker.stop()
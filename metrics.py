@@ -0,0 +1,195 @@
+import threading, time, weakref
+from bisect import bisect_left
+
+# =======================
+#  Metrics Section
+# =======================
+# Counter/histogram ringan dengan format teks Prometheus (tanpa dependency).
+# Tiap thread menulis ke shard miliknya sendiri (threading.local), jadi
+# jalur panas tidak mengambil lock; lock hanya dipakai saat thread baru
+# mendaftarkan shard dan saat /metrics menjumlahkan semua shard. Shard
+# thread yang sudah selesai (mis. thread per request Werkzeug) dilebur ke
+# total dasar, jadi jumlah shard mengikuti thread yang masih hidup.
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+SIZE_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 16384, 65536)
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _escape_label(value) -> str:
+    # Format teks Prometheus: \, " dan newline di nilai label wajib di-escape
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape_label(v)}"' for k, v in labels.items()) + '}'
+
+class _ShardOwner:
+    # Disimpan di threading.local; ikut dibuang saat thread selesai
+    __slots__ = ('__weakref__',)
+
+class _Sharded:
+    def __init__(self, name, help_text, kind):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self._local = threading.local()
+        self._shards = {}  # id owner -> shard thread yang masih hidup
+        self._base = None  # jumlah shard thread yang sudah selesai
+        self._lock = threading.RLock()
+
+    def _new_shard(self):
+        raise NotImplementedError
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+            owner = self._local.owner = _ShardOwner()
+            self._local.shard = shard
+            with self._lock:
+                self._shards[id(owner)] = shard
+            weakref.finalize(owner, self._retire, id(owner))
+            return shard
+
+    def _retire(self, key):
+        with self._lock:
+            shard = self._shards.pop(key, None)
+            if shard is None:
+                return
+            if self._base is None:
+                self._base = self._new_shard()
+            for i, value in enumerate(shard):
+                self._base[i] += value
+
+    def _snapshot(self):
+        with self._lock:
+            shards = [list(shard) for shard in self._shards.values()]
+            if self._base is not None:
+                shards.append(list(self._base))
+            return shards
+
+class Counter(_Sharded):
+    def __init__(self, name, help_text):
+        super().__init__(name, help_text, 'counter')
+
+    def _new_shard(self):
+        return [0]
+
+    def inc(self, amount=1):
+        self._shard()[0] += amount
+
+    @property
+    def value(self):
+        return sum(shard[0] for shard in self._snapshot())
+
+    def render(self):
+        yield f"{self.name} {_format_value(self.value)}"
+
+class Histogram(_Sharded):
+    # Shard: [count per bucket..., +Inf, sum]
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, 'histogram')
+        self.buckets = tuple(buckets)
+
+    def _new_shard(self):
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value):
+        shard = self._shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def time(self):
+        return _Timer(self)
+
+    def totals(self):
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        for shard in self._snapshot():
+            for i in range(len(counts)):
+                counts[i] += shard[i]
+            total += shard[-1]
+        return counts, total
+
+    def render(self):
+        counts, total = self.totals()
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), counts):
+            cumulative += count
+            yield f'{self.name}_bucket{{le="{bound}"}} {cumulative}'
+        yield f"{self.name}_sum {_format_value(total)}"
+        yield f"{self.name}_count {cumulative}"
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+class CallbackMetric:
+    # Nilai dibaca saat scrape (mis. kedalaman antrean, jumlah reconnect).
+    # Dengan label_name, fn mengembalikan dict {nilai label: nilai} (mis. per shard)
+    def __init__(self, name, help_text, kind, fn, labels=None, label_name=None):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.fn = fn
+        self.labels = labels
+        self.label_name = label_name
+
+    def render(self):
+        value = self.fn()
+        if value is None:
+            return
+        if self.label_name is None:
+            yield f"{self.name}{_format_labels(self.labels)} {_format_value(value)}"
+            return
+        for label, item in value.items():
+            labels = dict(self.labels or {}, **{self.label_name: label})
+            yield f"{self.name}{_format_labels(labels)} {_format_value(item)}"
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text):
+        return self._register(Counter(name, help_text))
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help_text, buckets))
+
+    def gauge_fn(self, name, help_text, fn, labels=None):
+        # Didaftarkan ulang (mis. objek baru) menggantikan callback lama
+        with self._lock:
+            self._metrics[name] = CallbackMetric(name, help_text, 'gauge', fn, labels)
+
+    def counter_fn(self, name, help_text, fn, label_name=None):
+        with self._lock:
+            self._metrics[name] = CallbackMetric(name, help_text, 'counter', fn, label_name=label_name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
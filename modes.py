@@ -0,0 +1,310 @@
+import os, threading, time
+from collections import deque
+
+# =======================
+#  CFB Mode Section
+# =======================
+# Mode operasi dipakai bersama oleh Simeck dan Skinny. Cipher cukup
+# menyediakan fungsi encrypt_block(int) -> int untuk satu blok.
+
+# Byte pertama payload = ukuran segmen CFB (bit), supaya subscriber
+# tahu mode mana yang dipakai publisher.
+MODE_CFB8 = 8
+MODE_CFB64 = 64
+CFB_SEGMENT_SIZES = (MODE_CFB8, MODE_CFB64)
+
+# CFB-64 (satu blok penuh per panggilan cipher) sebagai default cepat,
+# CFB-8 tetap tersedia untuk kompatibilitas.
+DEFAULT_SEGMENT_SIZE = int(os.environ.get('CFB_SEGMENT_SIZE', MODE_CFB64))
+
+
+def _check_segment_size(segment_size, block_size):
+    if segment_size not in CFB_SEGMENT_SIZES or segment_size > block_size:
+        raise ValueError(f"Ukuran segmen CFB tidak didukung: {segment_size}")
+
+
+# Objek stream: update() bisa dipanggil berulang per potongan data dan
+# menulis langsung ke buffer milik pemanggil (bytearray/memoryview).
+class CFBStream:
+    def __init__(self, encrypt_block, iv: bytes, segment_size=DEFAULT_SEGMENT_SIZE, block_size=64, decrypt=False):
+        _check_segment_size(segment_size, block_size)
+        self.segment_size = segment_size
+        self.decrypting = decrypt
+        self._encrypt_block = encrypt_block
+        self._seg_bytes = segment_size // 8
+        self._shift = block_size - segment_size
+        self._mask = (1 << block_size) - 1
+        self._prev = int.from_bytes(iv, 'big')
+        # Segmen yang belum lengkap di akhir update() sebelumnya
+        self._keystream = b''
+        self._feedback = bytearray(self._seg_bytes)
+        self._pos = 0
+        self._finalized = False
+
+    def _partial(self, src, dst, i, n):
+        ks = self._keystream
+        fb = self._feedback
+        pos = self._pos
+        seg_bytes = self._seg_bytes
+        while i < n and pos < seg_bytes:
+            b = src[i]
+            o = b ^ ks[pos]
+            dst[i] = o
+            fb[pos] = b if self.decrypting else o
+            pos += 1
+            i += 1
+        if pos == seg_bytes:
+            self._prev = ((self._prev << self.segment_size) | int.from_bytes(fb, 'big')) & self._mask
+            pos = 0
+        self._pos = pos
+        return i
+
+    def update(self, chunk, out=None):
+        # Return bytes jika out=None, selain itu jumlah byte yang ditulis ke out
+        if self._finalized:
+            raise ValueError("Stream sudah di-finalize")
+        src = memoryview(chunk).cast('B')
+        n = len(src)
+        result = bytearray(n) if out is None else out
+        dst = memoryview(result).cast('B')
+        if len(dst) < n:
+            raise ValueError("Buffer output terlalu kecil")
+
+        i = self._partial(src, dst, 0, n) if self._pos else 0
+
+        encrypt_block = self._encrypt_block
+        seg_bytes = self._seg_bytes
+        segment_size = self.segment_size
+        shift = self._shift
+        mask = self._mask
+        decrypting = self.decrypting
+        prev = self._prev
+        while n - i >= seg_bytes:
+            j = i + seg_bytes
+            data = int.from_bytes(src[i:j], 'big')
+            val = data ^ (encrypt_block(prev) >> shift)
+            dst[i:j] = val.to_bytes(seg_bytes, 'big')
+            prev = ((prev << segment_size) | (data if decrypting else val)) & mask
+            i = j
+        self._prev = prev
+
+        if i < n:
+            # Sisa data: keystream segmen berikutnya disimpan untuk update() lanjutan
+            self._keystream = (encrypt_block(prev) >> shift).to_bytes(seg_bytes, 'big')
+            self._partial(src, dst, i, n)
+
+        return bytes(result) if out is None else n
+
+    def finalize(self) -> bytes:
+        # CFB tidak memakai padding, tidak ada sisa output
+        self._finalized = True
+        return b''
+
+
+def unpack_cfb(payload: bytes):
+    segment_size = payload[0]
+    if segment_size not in CFB_SEGMENT_SIZES:
+        raise ValueError(f"Flag mode CFB tidak dikenal: {segment_size}")
+    return segment_size, payload[1:]
+
+# =======================
+#  CTR Mode Section
+# =======================
+# Payload CTR: flag MODE_CTR | counter awal 8 byte | ciphertext.
+# Counter ikut dikirim sehingga dekripsi tidak bergantung urutan pesan.
+MODE_CTR = 0xC0
+BLOCK_BYTES = 8
+
+
+def scalar_keystream(encrypt_block, counter: int, nblocks: int) -> bytes:
+    mask = (1 << (8 * BLOCK_BYTES)) - 1
+    return b''.join(encrypt_block((counter + i) & mask).to_bytes(BLOCK_BYTES, 'big') for i in range(nblocks))
+
+
+def xor_bytes(data: bytes, keystream: bytes) -> bytes:
+    n = len(data)
+    if n == 0:
+        return b''
+    return (int.from_bytes(data, 'big') ^ int.from_bytes(keystream[:n], 'big')).to_bytes(n, 'big')
+
+
+def ctr_encrypt(pool, data: bytes) -> bytes:
+    nblocks = -(-len(data) // BLOCK_BYTES)
+    counter, keystream = pool.take(nblocks)
+    return bytes([MODE_CTR]) + counter.to_bytes(BLOCK_BYTES, 'big') + xor_bytes(data, keystream)
+
+
+def ctr_decrypt(keystream_fn, payload: bytes) -> bytes:
+    counter, ciphertext = unpack_ctr(payload)
+    return CTRStream(keystream_fn, counter).update(ciphertext)
+
+
+def unpack_ctr(payload: bytes):
+    if payload[0] != MODE_CTR:
+        raise ValueError(f"Bukan payload CTR: {payload[0]}")
+    return int.from_bytes(payload[1:1 + BLOCK_BYTES], 'big'), payload[1 + BLOCK_BYTES:]
+
+
+# Versi stream dari CTR; counter awal harus sudah dicadangkan untuk
+# seluruh panjang pesan (mis. lewat KeystreamPool.reserve).
+class CTRStream:
+    def __init__(self, keystream_fn, counter: int, max_blocks=None):
+        self._keystream_fn = keystream_fn
+        self._counter = counter
+        self._blocks_left = max_blocks  # None = tanpa batas (dekripsi)
+        self._keystream = b''
+        self._finalized = False
+
+    def update(self, chunk, out=None):
+        if self._finalized:
+            raise ValueError("Stream sudah di-finalize")
+        src = memoryview(chunk).cast('B')
+        n = len(src)
+        result = bytearray(n) if out is None else out
+        dst = memoryview(result).cast('B')
+        if len(dst) < n:
+            raise ValueError("Buffer output terlalu kecil")
+
+        if len(self._keystream) < n:
+            nblocks = -(-(n - len(self._keystream)) // BLOCK_BYTES)
+            if self._blocks_left is not None:
+                if nblocks > self._blocks_left:
+                    raise ValueError("Data melebihi counter CTR yang dicadangkan")
+                self._blocks_left -= nblocks
+            self._keystream += self._keystream_fn(self._counter, nblocks)
+            self._counter = (self._counter + nblocks) & 0xFFFFFFFFFFFFFFFF
+        if n:
+            val = int.from_bytes(src, 'big') ^ int.from_bytes(self._keystream[:n], 'big')
+            dst[:n] = val.to_bytes(n, 'big')
+            self._keystream = self._keystream[n:]
+
+        return bytes(result) if out is None else n
+
+    def finalize(self) -> bytes:
+        self._finalized = True
+        return b''
+
+
+# Pool keystream diisi thread latar saat publisher idle, jadi /send
+# cukup mengambil keystream yang sudah jadi lalu XOR.
+class KeystreamPool:
+    def __init__(self, keystream_fn, depth=1024, refill_chunk=128, nonce=None):
+        self.keystream_fn = keystream_fn
+        self.depth = depth  # target jumlah blok di pool
+        self.refill_chunk = refill_chunk
+        if nonce is None:
+            nonce = int.from_bytes(os.urandom(4), 'big')
+        # Counter 64-bit = nonce sesi (32 bit atas) || nomor blok (32 bit bawah);
+        # setelah 2^32 blok counter akan masuk ke nonce berikutnya, jadi ditolak
+        self._next_counter = nonce << 32
+        self._counter_limit = (nonce + 1) << 32
+        self._runs = deque()  # [counter awal, bytearray keystream] berurutan
+        self._buffered = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self.hits = 0
+        self.misses = 0
+        self.blocks_generated = 0
+        self.blocks_dropped = 0
+        self.refill_seconds = 0.0
+
+    def _reserve(self, nblocks: int) -> int:
+        # Dipanggil dengan lock: counter tidak pernah dipakai dua kali
+        counter = self._next_counter
+        if counter + nblocks > self._counter_limit:
+            raise ValueError("Blok CTR untuk nonce ini habis (2^32 blok), buat backend dengan nonce baru")
+        self._next_counter = counter + nblocks
+        return counter
+
+    def reserve(self, nblocks: int) -> int:
+        # Cadangkan counter tanpa keystream, untuk CTRStream
+        with self._cond:
+            return self._reserve(nblocks)
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+        self._thread = threading.Thread(target=self._refill_loop, name='keystream-pool', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _refill_loop(self):
+        while True:
+            with self._cond:
+                while self._running and self._buffered >= self.depth:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                nblocks = min(self.refill_chunk, self.depth - self._buffered,
+                              self._counter_limit - self._next_counter)
+                if nblocks <= 0:
+                    return  # nonce habis: sisa pool masih dipakai, setelah itu take() menolak
+                counter = self._reserve(nblocks)
+
+            start = time.perf_counter()
+            keystream = self.keystream_fn(counter, nblocks)
+            elapsed = time.perf_counter() - start
+
+            with self._cond:
+                last = self._runs[-1] if self._runs else None
+                if last is not None and last[0] + len(last[1]) // BLOCK_BYTES == counter:
+                    last[1] += keystream
+                else:
+                    self._runs.append([counter, bytearray(keystream)])
+                self._buffered += nblocks
+                self.blocks_generated += nblocks
+                self.refill_seconds += elapsed
+
+    def take(self, nblocks: int):
+        with self._cond:
+            while self._runs:
+                run = self._runs[0]
+                available = len(run[1]) // BLOCK_BYTES
+                if available >= nblocks:
+                    counter = run[0]
+                    size = nblocks * BLOCK_BYTES
+                    keystream = bytes(run[1][:size])
+                    del run[1][:size]
+                    run[0] += nblocks
+                    if available == nblocks:
+                        self._runs.popleft()
+                    self._buffered -= nblocks
+                    self.hits += 1
+                    self._cond.notify()
+                    return counter, keystream
+                if len(self._runs) == 1:
+                    break
+                # Run pendek di depan tidak akan bertambah lagi, buang saja
+                self._runs.popleft()
+                self._buffered -= available
+                self.blocks_dropped += available
+
+            self.misses += 1
+            counter = self._reserve(nblocks)
+            self._cond.notify()
+
+        # Pool kosong/kurang: hitung langsung dengan counter baru
+        return counter, self.keystream_fn(counter, nblocks)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "depth": self._buffered,
+                "target_depth": self.depth,
+                "hits": self.hits,
+                "misses": self.misses,
+                "blocks_generated": self.blocks_generated,
+                "blocks_dropped": self.blocks_dropped,
+                "refill_rate_blocks_per_s": self.blocks_generated / self.refill_seconds if self.refill_seconds else 0.0,
+            }
@@ -0,0 +1,147 @@
+import cProfile, io, os, pstats, random, threading, time
+from collections import deque
+
+# =======================
+#  Profiling Section
+# =======================
+# Profiling on-demand untuk jalur request (/send) dan pesan (subscriber).
+# PROFILE_SAMPLE_RATE (0..1) menentukan porsi request/pesan yang dicatat
+# per tahap (parse, encrypt, base64, connect, publish, ack, decrypt, ...).
+# Saat nonaktif, sample() mengembalikan NULL_TRACE yang semua metodenya
+# kosong, jadi biayanya hanya satu perbandingan per request.
+# cProfile bisa diaktifkan sementara (capture) untuk melihat isi loop cipher;
+# hasilnya ditulis sebagai file .pstats di PROFILE_DIR.
+class _NullTrace:
+    def lap(self, stage):
+        pass
+
+    def add(self, stage, seconds):
+        pass
+
+    def finish(self):
+        pass
+
+    def __bool__(self):
+        return False
+
+NULL_TRACE = _NullTrace()
+
+class Trace:
+    __slots__ = ('profiler', 'kind', 'start', 'last', 'stages')
+
+    def __init__(self, profiler, kind):
+        self.profiler = profiler
+        self.kind = kind
+        self.start = self.last = time.perf_counter()
+        self.stages = []
+
+    def lap(self, stage):
+        # Waktu sejak lap sebelumnya dicatat sebagai tahap ini
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def add(self, stage, seconds):
+        self.stages.append((stage, seconds))
+
+    def finish(self):
+        self.stages.append(('total', time.perf_counter() - self.start))
+        self.profiler._record(self.kind, self.stages)
+
+class Profiler:
+    def __init__(self, rate=0.0, window=1000, profile_dir='profiles'):
+        self.rate = rate
+        self.window = window
+        self.profile_dir = profile_dir
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._capture = None
+        self._capture_lock = threading.Lock()
+        self._capture_started = None
+
+    # --- Sampling per tahap ---
+    def sample(self, kind: str):
+        rate = self.rate
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return NULL_TRACE
+        return Trace(self, kind)
+
+    def set_rate(self, rate: float):
+        self.rate = min(max(float(rate), 0.0), 1.0)
+
+    def _record(self, kind, stages):
+        with self._lock:
+            by_stage = self._stages.setdefault(kind, {})
+            for stage, seconds in stages:
+                entry = by_stage.get(stage)
+                if entry is None:
+                    entry = by_stage[stage] = [0, 0.0, deque(maxlen=self.window)]
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2].append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+
+    def stats(self):
+        with self._lock:
+            snapshot = {kind: {stage: (e[0], e[1], sorted(e[2])) for stage, e in stages.items()}
+                        for kind, stages in self._stages.items()}
+        result = {}
+        for kind, stages in snapshot.items():
+            result[kind] = {
+                stage: {
+                    "count": count,
+                    "mean_ms": total / count * 1e3,
+                    "p50_ms": recent[len(recent) // 2] * 1e3,
+                    "p95_ms": recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1e3,
+                    "max_ms": recent[-1] * 1e3,
+                }
+                for stage, (count, total, recent) in stages.items()
+            }
+        return {"sample_rate": self.rate, "capturing": self._capture is not None, "stages": result}
+
+    # --- cProfile ---
+    def profile_call(self, fn, *args, **kwargs):
+        # Tanpa capture aktif langsung dipanggil; saat capture, panggilan
+        # diserialkan karena satu objek cProfile tidak aman dipakai bersamaan
+        if self._capture is None:
+            return fn(*args, **kwargs)
+        with self._capture_lock:
+            profile = self._capture
+            if profile is None:
+                return fn(*args, **kwargs)
+            return profile.runcall(fn, *args, **kwargs)
+
+    def start_capture(self):
+        with self._capture_lock:
+            if self._capture is None:
+                self._capture = cProfile.Profile()
+                self._capture_started = time.strftime('%Y%m%d-%H%M%S')
+        return self
+
+    def stop_capture(self, top=25):
+        with self._capture_lock:
+            profile, self._capture = self._capture, None
+        if profile is None:
+            return None, ''
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"profile_{self._capture_started}_{os.getpid()}.pstats")
+        profile.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(top)
+        return path, out.getvalue()
+
+    def capture_for(self, seconds: float):
+        # Capture otomatis selama N detik (mis. dari env saat start)
+        self.start_capture()
+        timer = threading.Timer(seconds, lambda: print(f"📈 Profil cProfile disimpan: {self.stop_capture()[0]}"))
+        timer.daemon = True
+        timer.start()
+        return timer
+
+PROFILER = Profiler(
+    rate=float(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+    profile_dir=os.environ.get('PROFILE_DIR', 'profiles'),
+)
@@ -0,0 +1,350 @@
+import os, threading, itertools, time
+from collections import deque
+from concurrent.futures import Future
+from paho.mqtt import client as mqtt_client
+from metrics import REGISTRY, SIZE_BUCKETS
+from profiling import NULL_TRACE
+from readings import pack_frame, MAX_ITEM_BYTES
+
+# =======================
+#  MQTT Publisher Section
+# =======================
+# Client publisher dibuat sekali dan tetap terhubung: loop paho berjalan
+# di thread sendiri dan otomatis reconnect, jadi tiap request cukup
+# publish lalu menunggu ACK (QoS 1) dengan batas waktu.
+class PublishError(Exception):
+    pass
+
+PUBLISH_SECONDS = REGISTRY.histogram('mqtt_publish_seconds', "Waktu menyerahkan PUBLISH ke client paho")
+PUBLISH_ACK_SECONDS = REGISTRY.histogram('mqtt_publish_ack_seconds', "Waktu dari PUBLISH sampai ACK broker")
+PUBLISH_FAILURES = REGISTRY.counter('mqtt_publish_failures_total', "Publish gagal (tanpa koneksi/ACK)")
+PUBLISH_BYTES = REGISTRY.histogram('mqtt_publish_bytes', "Ukuran payload yang dipublish", SIZE_BUCKETS)
+
+class MQTTPublisher:
+    def __init__(self, broker, port, client_id, qos=1, timeout=5.0, keepalive=60, max_inflight=20,
+                 protocol=mqtt_client.MQTTv311):
+        self.broker = broker
+        self.port = port
+        self.client_id = client_id
+        self.qos = qos
+        self.timeout = timeout
+        self.keepalive = keepalive
+        self.reconnects = 0
+        self._ever_connected = False
+        self._connected = threading.Event()
+        self._started = False
+        self._lock = threading.Lock()
+        # mid -> waktu publish / waktu ACK yang tiba duluan, plus mid yang ACK-nya
+        # sudah tidak ditunggu (forget); diakses thread paho dan thread request,
+        # jadi selalu di bawah _ack_lock. paho memakai ulang mid (16 bit), jadi
+        # entri lama tertimpa/dibersihkan saat mid yang sama dipakai lagi.
+        self._inflight = {}
+        self._early_acks = {}
+        self._abandoned = set()
+        self._ack_lock = threading.Lock()
+
+        self.client = mqtt_client.Client(client_id=client_id, protocol=protocol)
+        self.client.reconnect_delay_set(min_delay=1, max_delay=30)
+        self.client.max_inflight_messages_set(max_inflight)
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_publish = self._on_publish
+
+    # properties hanya dikirim paho untuk MQTT v5 (rc berupa ReasonCodes)
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
+        if rc == 0:
+            if self._ever_connected:
+                self.reconnects += 1
+            self._ever_connected = True
+            self._connected.set()
+            print(f"✅ Publisher {self.client_id} terhubung ke broker!")
+        else:
+            print(f"❌ Publisher {self.client_id} gagal koneksi, kode: {rc}")
+
+    def _on_disconnect(self, client, userdata, rc, properties=None):
+        self._connected.clear()
+        if rc != 0:
+            print(f"⚠️ Publisher {self.client_id} terputus (kode {rc}), mencoba reconnect...")
+
+    def _on_publish(self, client, userdata, mid):
+        # ACK bisa tiba sebelum submit() sempat mencatat mid (thread paho)
+        now = time.perf_counter()
+        with self._ack_lock:
+            start = self._inflight.pop(mid, None)
+            if start is None and mid in self._abandoned:
+                self._abandoned.discard(mid)  # ACK terlambat, pengirimnya sudah menyerah
+            elif start is None:
+                self._early_acks[mid] = now
+        if start is not None:
+            PUBLISH_ACK_SECONDS.observe(now - start)
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return self
+            self._started = True
+        # connect_async + loop_start: koneksi dan reconnect diurus thread paho
+        self.client.connect_async(self.broker, self.port, self.keepalive)
+        self.client.loop_start()
+        return self
+
+    def stop(self):
+        with self._lock:
+            if not self._started:
+                return
+            self._started = False
+        self.client.disconnect()
+        self.client.loop_stop()
+
+    def wait_connected(self, timeout=None) -> bool:
+        return self._connected.wait(self.timeout if timeout is None else timeout)
+
+    def publish(self, topic, payload, qos=None, timeout=None, trace=NULL_TRACE):
+        self.start()
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        info = self.submit(topic, payload, qos, deadline, trace)
+        try:
+            info.wait_for_publish(max(deadline - time.monotonic(), 0))
+        except (ValueError, RuntimeError) as e:
+            PUBLISH_FAILURES.inc()
+            self.forget(info)
+            raise PublishError(str(e)) from e
+        if not info.is_published():
+            PUBLISH_FAILURES.inc()
+            self.forget(info)
+            raise PublishError(f"Tidak ada ACK dari broker dalam {timeout:.1f} detik")
+        trace.lap('ack')
+        return info
+
+    def forget(self, info):
+        # Dipanggil saat ACK tidak ditunggu lagi (timeout/gagal): mid dilepas
+        # dari _inflight, ACK yang masih datang belakangan diabaikan
+        with self._ack_lock:
+            if self._inflight.pop(info.mid, None) is not None:
+                self._abandoned.add(info.mid)
+
+    def submit(self, topic, payload, qos=None, deadline=None, trace=NULL_TRACE):
+        # Publish tanpa menunggu ACK; hasilnya ditunggu lewat wait_for_acks
+        self.start()
+        deadline = time.monotonic() + self.timeout if deadline is None else deadline
+        if not self._connected.wait(max(deadline - time.monotonic(), 0)):
+            PUBLISH_FAILURES.inc()
+            raise PublishError(f"Tidak terhubung ke broker {self.broker}:{self.port}")
+        trace.lap('connect')
+        start = time.perf_counter()
+        info = self.client.publish(topic, payload, qos=self.qos if qos is None else qos)
+        PUBLISH_SECONDS.observe(time.perf_counter() - start)
+        trace.lap('publish')
+        PUBLISH_BYTES.observe(len(payload))
+        if info.rc not in (mqtt_client.MQTT_ERR_SUCCESS, mqtt_client.MQTT_ERR_NO_CONN):
+            PUBLISH_FAILURES.inc()
+            raise PublishError(mqtt_client.error_string(info.rc))
+        with self._ack_lock:
+            self._abandoned.discard(info.mid)
+            acked = self._early_acks.pop(info.mid, None)
+            if acked is None:
+                self._inflight[info.mid] = start
+        if acked is not None:
+            PUBLISH_ACK_SECONDS.observe(acked - start)
+        return info
+
+def wait_for_acks(infos, deadline, publishers):
+    # Semua ACK ditunggu dengan satu deadline bersama. Elemen infos boleh
+    # berupa PublishError (gagal saat submit); publishers[i] = publisher yang
+    # mengirim infos[i], untuk forget() pesan yang gagal. Hasil: None jika
+    # terkirim, atau pesan error per pesan.
+    errors = []
+    for info, publisher in zip(infos, publishers):
+        if isinstance(info, PublishError):
+            errors.append(str(info))
+            continue
+        try:
+            info.wait_for_publish(max(deadline - time.monotonic(), 0))
+        except (ValueError, RuntimeError) as e:
+            PUBLISH_FAILURES.inc()
+            publisher.forget(info)
+            errors.append(str(e))
+            continue
+        if info.is_published():
+            errors.append(None)
+        else:
+            PUBLISH_FAILURES.inc()
+            publisher.forget(info)
+            errors.append("Tidak ada ACK dari broker sebelum batas waktu")
+    return errors
+
+class PublisherPool:
+    # Beberapa koneksi publisher dengan client ID unik per proses, dipakai bergiliran
+    def __init__(self, broker, port, client_id_prefix, size=1, qos=1, timeout=5.0, max_inflight=20,
+                 protocol=mqtt_client.MQTTv311):
+        self.timeout = timeout
+        self.publishers = [
+            MQTTPublisher(broker, port, f"{client_id_prefix}-{os.getpid()}-{i}", qos, timeout,
+                          max_inflight=max_inflight, protocol=protocol)
+            for i in range(size)
+        ]
+        self._cycle = itertools.cycle(self.publishers)
+        self._lock = threading.Lock()
+
+    def start(self):
+        for publisher in self.publishers:
+            publisher.start()
+        return self
+
+    def stop(self):
+        for publisher in self.publishers:
+            publisher.stop()
+
+    def publish(self, topic, payload, qos=None, timeout=None, trace=NULL_TRACE):
+        with self._lock:
+            publisher = next(self._cycle)
+        return publisher.publish(topic, payload, qos, timeout, trace)
+
+    def publish_many(self, topic, payloads, qos=None, timeout=None):
+        # Pipelined: semua pesan dikirim dulu (dibagi ke semua koneksi),
+        # baru ACK-nya ditunggu. Hasil per pesan: None atau pesan error.
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self._lock:
+            publishers = [next(self._cycle) for _ in self.publishers]
+        infos, senders = [], []
+        for i, payload in enumerate(payloads):
+            publisher = publishers[i % len(publishers)]
+            senders.append(publisher)
+            try:
+                infos.append(publisher.submit(topic, payload, qos, deadline))
+            except PublishError as e:
+                infos.append(e)
+        return wait_for_acks(infos, deadline, senders)
+
+    @property
+    def reconnects(self):
+        return sum(p.reconnects for p in self.publishers)
+
+# =======================
+#  Coalescing Section
+# =======================
+# Pembacaan ditampung maksimal window_ms atau max_bytes, lalu satu frame
+# dienkripsi sekali dan dipublish sebagai satu pesan MQTT. submit()
+# mengembalikan Future yang selesai saat frame-nya di-ACK broker.
+class CoalescingPublisher:
+    def __init__(self, publisher, topic, encrypt_fn, window_ms=50, max_bytes=1024):
+        self.publisher = publisher
+        self.topic = topic
+        self.encrypt_fn = encrypt_fn
+        self.window_ms = window_ms
+        self.max_bytes = max_bytes
+        self.frames = 0
+        self.readings = 0
+        self.frame_bytes = 0
+        self.failures = 0
+        self.histogram = {}
+        self.flush_reasons = {'time': 0, 'size': 0, 'stop': 0}
+        self._pending = []
+        self._size = 1
+        self._first_at = 0.0
+        self._ready = deque()
+        self._closing = False
+        self._thread = None
+        self._cond = threading.Condition()
+        self._stats_lock = threading.Lock()
+
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._closing = False
+                self._thread = threading.Thread(target=self._run, name="coalescer", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def submit(self, reading) -> Future:
+        data = reading.encode() if isinstance(reading, str) else reading
+        future = Future()
+        if len(data) > MAX_ITEM_BYTES:
+            # Tidak muat di header frame: langsung gagal, batch lain tidak terpengaruh
+            future.set_exception(PublishError(f"Pembacaan {len(data)} byte melebihi {MAX_ITEM_BYTES} byte"))
+            return future
+        with self._cond:
+            if self._pending and self._size + 2 + len(data) > self.max_bytes:
+                self._ready.append((self._pending, 'size'))
+                self._pending, self._size = [], 1
+            if not self._pending:
+                self._first_at = time.monotonic()
+            self._pending.append((data, future))
+            self._size += 2 + len(data)
+            self._cond.notify()
+        return future
+
+    def _next_batch(self):
+        with self._cond:
+            while True:
+                if self._ready:
+                    return self._ready.popleft()
+                if self._pending:
+                    remaining = self._first_at + self.window_ms / 1000 - time.monotonic()
+                    if remaining <= 0 or self._closing:
+                        batch, self._pending, self._size = self._pending, [], 1
+                        return batch, 'stop' if self._closing else 'time'
+                    self._cond.wait(remaining)
+                elif self._closing:
+                    return None
+                else:
+                    self._cond.wait()
+
+    def _run(self):
+        while True:
+            item = self._next_batch()
+            if item is None:
+                return
+            try:
+                self._flush(*item)
+            except Exception as e:
+                # Hanya batch ini yang gagal; thread coalescer tetap berjalan
+                print(f"⚠️ Coalescer gagal mengirim batch: {e}")
+                for _, future in item[0]:
+                    if not future.done():
+                        future.set_exception(PublishError(str(e)))
+
+    def _flush(self, batch, reason):
+        frame, error = b'', None
+        try:
+            frame = pack_frame([data for data, _ in batch])
+            self.publisher.publish(self.topic, self.encrypt_fn(frame))
+        except Exception as e:
+            error = e if isinstance(e, PublishError) else PublishError(str(e))
+        for _, future in batch:
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+        bucket = 1 << (len(batch) - 1).bit_length()  # batas atas pangkat dua: 1, 2, 4, 8, ...
+        with self._stats_lock:
+            self.frames += 1
+            self.readings += len(batch)
+            self.frame_bytes += len(frame)
+            self.failures += error is not None
+            self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+            self.flush_reasons[reason] += 1
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "window_ms": self.window_ms,
+                "max_bytes": self.max_bytes,
+                "frames": self.frames,
+                "readings": self.readings,
+                "failures": self.failures,
+                "avg_batch": self.readings / self.frames if self.frames else 0.0,
+                "avg_frame_bytes": self.frame_bytes / self.frames if self.frames else 0.0,
+                "batch_histogram": {f"<={size}": count for size, count in sorted(self.histogram.items())},
+                "flush_reasons": dict(self.flush_reasons),
+            }
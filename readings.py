@@ -0,0 +1,116 @@
+import json, struct
+
+# =======================
+#  Reading Section
+# =======================
+# Satu pembacaan sensor: angka suhu saja, atau objek
+# {"suhu": ..., "site": ..., "sensor_id": ..., "timestamp": ...}. Tanpa
+# sensor_id/timestamp plaintext tetap string suhu seperti /send; dengan
+# metadata dikirim sebagai JSON. site hanya menentukan topik, seperti /send.
+class ReadingError(ValueError):
+    pass
+
+# sensor_id/site dipakai sebagai satu level topik MQTT (<topic>/<site>/<sensor_id>)
+TOPIC_LEVEL_FORBIDDEN = ('/', '+', '#', '\0')
+
+def topic_level(value, name: str) -> str:
+    value = str(value)
+    if not value or any(c in value for c in TOPIC_LEVEL_FORBIDDEN):
+        raise ReadingError(f"{name} tidak boleh kosong atau berisi '/', '+', '#' maupun NUL")
+    return value
+
+def parse_reading(item):
+    if isinstance(item, dict):
+        suhu = item.get('suhu')
+        site = item.get('site')
+        sensor_id = item.get('sensor_id')
+        timestamp = item.get('timestamp')
+    else:
+        suhu, site, sensor_id, timestamp = item, None, None, None
+
+    if suhu is None or suhu == '' or isinstance(suhu, bool):
+        raise ReadingError("Masukkan suhu")
+    try:
+        suhu_str = str(float(suhu))
+    except (TypeError, ValueError):
+        raise ReadingError("Format suhu tidak valid")
+    if site is not None and not isinstance(site, (str, int)):
+        raise ReadingError("site harus string atau angka")
+    if sensor_id is not None and not isinstance(sensor_id, (str, int)):
+        raise ReadingError("sensor_id harus string atau angka")
+    if timestamp is not None and (isinstance(timestamp, bool) or not isinstance(timestamp, (str, int, float))):
+        raise ReadingError("timestamp harus string atau angka")
+
+    reading = {'suhu': suhu_str}
+    if site is not None:
+        reading['site'] = topic_level(site, 'site')
+    if sensor_id is not None:
+        reading['sensor_id'] = topic_level(sensor_id, 'sensor_id')
+    if timestamp is not None:
+        reading['timestamp'] = timestamp
+    return reading
+
+def encode_reading(reading: dict) -> str:
+    fields = {k: v for k, v in reading.items() if k != 'site'}
+    if len(fields) == 1:
+        return fields['suhu']
+    return json.dumps(fields, separators=(',', ':'))
+
+def describe_reading(plaintext: str) -> str:
+    # Untuk log subscriber: "23.5°C" atau "23.5°C (sensor a1, 1700000000)"
+    if not plaintext.startswith('{'):
+        return f"{plaintext}°C"
+    reading = json.loads(plaintext)
+    extra = ', '.join(str(reading[k]) for k in ('sensor_id', 'timestamp') if k in reading)
+    return f"{reading.get('suhu')}°C ({extra})"
+
+def parse_batch(body, max_items: int):
+    # Kembalikan (readings, results): item tidak valid langsung diberi status error
+    if isinstance(body, dict):
+        body = body.get('readings')
+    if not isinstance(body, list) or not body:
+        raise ReadingError("Kirim array JSON berisi pembacaan suhu")
+    if len(body) > max_items:
+        raise ReadingError(f"Maksimal {max_items} pembacaan per batch")
+
+    readings, results = [], []
+    for index, item in enumerate(body):
+        try:
+            reading = parse_reading(item)
+        except ReadingError as e:
+            results.append({'index': index, 'status': 'error', 'error': str(e)})
+            continue
+        readings.append((index, reading))
+        results.append(dict(reading, index=index, status='pending'))
+    return readings, results
+
+# =======================
+#  Frame Section
+# =======================
+# Beberapa pembacaan digabung jadi satu plaintext sebelum dienkripsi:
+#   [0x00][len:2][pembacaan][len:2][pembacaan]...
+# Pembacaan tunggal tidak pernah diawali byte 0x00 (angka atau JSON),
+# jadi subscriber bisa membedakan frame dari pesan biasa.
+FRAME_TAG = 0x00
+ITEM_HEADER = struct.Struct('>H')
+MAX_ITEM_BYTES = 0xFFFF  # panjang satu pembacaan di frame (header 2 byte)
+
+def pack_frame(items) -> bytes:
+    parts = [bytes([FRAME_TAG])]
+    for item in items:
+        parts.append(ITEM_HEADER.pack(len(item)))
+        parts.append(item)
+    return b''.join(parts)
+
+def split_readings(plaintext: bytes) -> list:
+    if not plaintext or plaintext[0] != FRAME_TAG:
+        return [plaintext.decode()]
+    view, readings, offset = memoryview(plaintext), [], 1
+    while offset < len(view):
+        (size,) = ITEM_HEADER.unpack_from(view, offset)
+        offset += ITEM_HEADER.size
+        if offset + size > len(view):
+            raise ValueError("Frame terpotong")
+        readings.append(str(view[offset:offset + size], 'utf-8'))
+        offset += size
+    return readings
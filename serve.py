@@ -0,0 +1,122 @@
+import argparse, multiprocessing, os, signal, socket, sys, time
+from backends import KEY_GENERATORS
+from sessionkey import (publish_key_shm, release_key_shm, load_or_create_key_file, set_inherited_key,
+                        reset_nonce_file, session_nonce_path)
+
+# =======================
+#  Serving Section
+# =======================
+# Mode produksi multi-proses untuk appmqtt:
+#   --workers N      proses ingest HTTP, berbagi satu socket listen (kernel
+#                    membagi koneksi), masing-masing dengan publisher sendiri
+#   --subscribers M  proses subscriber (dekripsi) terpisah dari ingest; M > 1
+#                    memakai shared subscription ($share/<grup>/...), jadi
+#                    broker membagi pesan ke M proses, bukan menggandakannya
+# Semua proses memakai satu key sesi: dibuat launcher (atau dibaca dari
+# KEY_FILE bila diisi) sebelum fork dan diwarisi worker; segmen shared
+# memory KEY_SHM untuk proses lain di mesin yang sama. MQTT_BROKER=loopback
+# menjalankan broker lokal di proses sendiri dan semua worker terhubung ke sana.
+# Proses anak di-fork sebelum appmqtt di-import, jadi tiap worker membuat
+# koneksi MQTT, pool keystream dan thread-nya sendiri. Nonce CTR tiap proses
+# diambil dari file counter key sesi (lihat session_nonce_path), bukan acak.
+def _run_broker(conn):
+    from localbroker import LocalBroker
+    broker = LocalBroker('127.0.0.1', int(os.environ.get('MQTT_PORT', 0))).start_in_thread()
+    conn.send(broker.port)
+    conn.close()
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        while True:
+            time.sleep(3600)
+    finally:
+        broker.stop()
+
+def _run_ingest(fd, host, http_port):
+    from appmqtt import run_publisher
+    run_publisher(host, http_port, fd=fd)
+
+def _run_subscriber():
+    from appmqtt import run_subscriber
+    run_subscriber()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Jalankan appmqtt multi-proses dengan key sesi bersama")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="proses ingest HTTP (0 = tanpa)")
+    parser.add_argument('--subscribers', type=int, default=1, help="proses subscriber (0 = tanpa)")
+    parser.add_argument('--host', default=os.environ.get('HTTP_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('HTTP_PORT', 5000)))
+    parser.add_argument('--share-group', default=os.environ.get('MQTT_SHARE_GROUP'),
+                        help="grup shared subscription (default 'case2kkd' bila --subscribers > 1)")
+    parser.add_argument('--report', type=float, default=float(os.environ.get('SUBSCRIBER_REPORT_SECONDS', 10)),
+                        help="interval laporan throughput per subscriber/shard (detik, 0 = mati)")
+    args = parser.parse_args(argv)
+
+    cipher = os.environ.get('CIPHER', '3des')
+    if cipher not in KEY_GENERATORS:
+        raise SystemExit(f"CIPHER tidak dikenal: {cipher} (pilih: {', '.join(KEY_GENERATORS)})")
+    if args.share_group is None and args.subscribers > 1:
+        args.share_group = 'case2kkd'
+    if args.share_group:
+        os.environ['MQTT_SHARE_GROUP'] = args.share_group
+        os.environ.setdefault('MQTT_PROTOCOL', '5')
+        print(f"🔀 {args.subscribers} subscriber di shared subscription grup '{args.share_group}'")
+    os.environ['SUBSCRIBER_REPORT_SECONDS'] = str(args.report)
+    ctx = multiprocessing.get_context('fork')
+    children, shm = [], None
+    try:
+        if os.environ.get('KEY_FILE'):
+            set_inherited_key(cipher, *load_or_create_key_file(os.environ['KEY_FILE'], cipher))
+            print(f"🔑 Key sesi dari file {os.environ['KEY_FILE']}")
+        else:
+            key, iv = KEY_GENERATORS[cipher]()
+            set_inherited_key(cipher, key, iv)
+            os.environ['KEY_SHM'] = f"case2kkd-{cipher}-{os.getpid()}"
+            shm = publish_key_shm(os.environ['KEY_SHM'], cipher, key, iv)
+            reset_nonce_file(session_nonce_path())
+            print(f"🔑 Key sesi di shared memory '{os.environ['KEY_SHM']}'")
+
+        if os.environ.get('MQTT_BROKER') == 'loopback':
+            receiver, sender = ctx.Pipe(duplex=False)
+            broker = ctx.Process(target=_run_broker, args=(sender,), name='broker')
+            broker.start()
+            children.append(broker)
+            os.environ['MQTT_BROKER'], os.environ['MQTT_PORT'] = '127.0.0.1', str(receiver.recv())
+            print(f"🧪 Broker MQTT lokal di mqtt://127.0.0.1:{os.environ['MQTT_PORT']}")
+
+        workers = [ctx.Process(target=_run_subscriber, name=f'subscriber-{i}') for i in range(args.subscribers)]
+        listener = None
+        if args.workers > 0:
+            listener = socket.create_server((args.host, args.port), backlog=512)
+            workers += [ctx.Process(target=_run_ingest, args=(listener.fileno(), args.host, args.port),
+                                    name=f'ingest-{i}') for i in range(args.workers)]
+        for worker in workers:
+            worker.start()
+            children.append(worker)
+        if listener is not None:
+            print(f"🚀 {args.workers} worker ingest di http://{args.host}:{args.port}, "
+                  f"{args.subscribers} subscriber ({cipher})")
+
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        # Satu proses berhenti = semua dihentikan (supervisor luar yang me-restart)
+        while all(child.is_alive() for child in children):
+            time.sleep(0.5)
+        for child in children:
+            if not child.is_alive():
+                print(f"❌ Proses {child.name} berhenti (exit {child.exitcode})")
+        return 1
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        # Worker dihentikan sebelum broker (urutan terbalik dari start)
+        for child in reversed(children):
+            if child.is_alive():
+                child.terminate()
+        for child in children:
+            if child.pid is not None:
+                child.join(5)
+        if shm is not None:
+            release_key_shm(shm)
+            os.unlink(session_nonce_path())
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+import atexit, fcntl, json, os, tempfile, time
+from multiprocessing import resource_tracker, shared_memory
+from backends import KEY_GENERATORS
+
+# =======================
+#  Session Key Section
+# =======================
+# Satu set key/IV dipakai bersama oleh semua worker proses, supaya pesan
+# dari publisher mana pun bisa didekripsi subscriber mana pun:
+#   KEY_SHM  = nama segmen shared memory (dibuat launcher serve.py)
+#   KEY_FILE = path file JSON key (dibuat sekali dengan permission 0600;
+#              worker yang start bersamaan tetap mendapat key yang sama)
+# Tanpa keduanya key dibuat acak per proses (mode dev satu proses).
+# serve.py memasang key lewat set_inherited_key sebelum fork, jadi worker
+# anaknya mewarisi key tanpa membuka segmen shared memory; KEY_SHM tetap
+# dibaca proses lain yang tidak di-fork dari launcher.
+# Round key tidak ikut disimpan: diturunkan deterministik dari key dan
+# di-cache sekali per proses (simeck_cache / tweakey_schedule).
+LENGTH_BYTES = 4
+NONCE_LIMIT = 1 << 32
+
+_inherited = {}  # cipher -> (key, iv) dari launcher
+
+def encode_key_material(cipher: str, key, iv: bytes) -> bytes:
+    return json.dumps({
+        "cipher": cipher,
+        "key_type": "int" if isinstance(key, int) else "bytes",
+        "key": format(key, 'x') if isinstance(key, int) else key.hex(),
+        "iv": iv.hex(),
+        "created": int(time.time()),
+    }).encode()
+
+def decode_key_material(data: bytes, cipher: str):
+    material = json.loads(data)
+    if material["cipher"] != cipher:
+        raise ValueError(f"Key untuk cipher {material['cipher']}, bukan {cipher}")
+    key = int(material["key"], 16) if material["key_type"] == "int" else bytes.fromhex(material["key"])
+    return key, bytes.fromhex(material["iv"])
+
+# --- Key file ---
+def write_key_file(path: str, cipher: str, key, iv: bytes):
+    # O_EXCL: gagal (FileExistsError) jika proses lain sudah membuat file
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(encode_key_material(cipher, key, iv))
+
+def load_or_create_key_file(path: str, cipher: str):
+    try:
+        with open(path, 'rb') as f:
+            return decode_key_material(f.read(), cipher)
+    except FileNotFoundError:
+        pass
+    key, iv = KEY_GENERATORS[cipher]()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    write_key_file(tmp, cipher, key, iv)
+    try:
+        # link gagal jika file sudah ada: pemenang balapan yang dipakai
+        os.link(tmp, path)
+    except FileExistsError:
+        with open(path, 'rb') as f:
+            key, iv = decode_key_material(f.read(), cipher)
+    finally:
+        os.unlink(tmp)
+    return key, iv
+
+# --- Shared memory ---
+# Python < 3.13: resource_tracker menghapus segmen saat proses yang
+# mendaftarkannya keluar, jadi registrasi dibuat seimbang: pembuat
+# melepas registrasinya sampai release_key_shm, pembaca langsung melepas.
+# Python 3.13+: pembaca memakai track=False dan tidak menyentuh tracker.
+def publish_key_shm(name: str, cipher: str, key, iv: bytes) -> shared_memory.SharedMemory:
+    data = encode_key_material(cipher, key, iv)
+    shm = shared_memory.SharedMemory(name=name, create=True, size=LENGTH_BYTES + len(data))
+    shm.buf[:LENGTH_BYTES] = len(data).to_bytes(LENGTH_BYTES, 'big')
+    shm.buf[LENGTH_BYTES:LENGTH_BYTES + len(data)] = data
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+def release_key_shm(shm: shared_memory.SharedMemory):
+    resource_tracker.register(shm._name, 'shared_memory')
+    shm.close()
+    shm.unlink()
+
+def read_key_shm(name: str, cipher: str):
+    try:
+        shm, tracked = shared_memory.SharedMemory(name=name, track=False), False
+    except TypeError:  # Python < 3.13
+        shm, tracked = shared_memory.SharedMemory(name=name), True
+    try:
+        length = int.from_bytes(shm.buf[:LENGTH_BYTES], 'big')
+        data = bytes(shm.buf[LENGTH_BYTES:LENGTH_BYTES + length])
+    finally:
+        if tracked:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        shm.close()
+    return decode_key_material(data, cipher)
+
+def set_inherited_key(cipher: str, key, iv: bytes):
+    _inherited[cipher] = (key, iv)
+
+# --- Nonce CTR ---
+# Semua backend CTR yang memakai key sesi (worker serve.py, worker proses
+# aioapp, worker BulkCipherPool) mengambil nonce dari satu file counter
+# yang dikunci flock, seperti kolom ctr_nonce di keystore: nonce naik
+# monoton dan tidak terpakai dua kali, juga setelah restart:
+#   KEY_FILE       -> <KEY_FILE>.nonce, persist bersama key
+#   KEY_SHM        -> <tmp>/<KEY_SHM>.nonce, dibuat ulang launcher
+#   KEY_NONCE_FILE -> path eksplisit; diisi otomatis untuk key acak per proses
+def reserve_nonce(path: str) -> int:
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    with os.fdopen(fd, 'r+') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        text = f.read().strip()
+        nonce = int(text) if text else 0
+        if nonce >= NONCE_LIMIT:
+            raise ValueError(f"Nonce CTR di {path} habis, buat key sesi baru")
+        f.seek(0)
+        f.truncate()
+        f.write(str(nonce + 1))
+        f.flush()
+        os.fsync(f.fileno())
+    return nonce
+
+def reset_nonce_file(path: str):
+    # Key baru: counter mulai lagi dari 0
+    with open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+        f.write('0')
+
+def _remove_nonce_file(path: str, owner: int):
+    if os.getpid() == owner:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+def session_nonce_path() -> str:
+    if os.environ.get('KEY_NONCE_FILE'):
+        return os.environ['KEY_NONCE_FILE']
+    if os.environ.get('KEY_FILE'):
+        return os.environ['KEY_FILE'] + '.nonce'
+    if os.environ.get('KEY_SHM'):
+        return os.path.join(tempfile.gettempdir(), os.environ['KEY_SHM'] + '.nonce')
+    # Key acak per proses: file sementara, diwarisi worker proses lewat env
+    fd, path = tempfile.mkstemp(prefix='case2kkd-', suffix='.nonce')
+    os.close(fd)
+    os.environ['KEY_NONCE_FILE'] = path
+    atexit.register(_remove_nonce_file, path, os.getpid())
+    return path
+
+def session_nonce() -> int:
+    return reserve_nonce(session_nonce_path())
+
+def load_session_key(cipher: str):
+    if cipher in _inherited:
+        return _inherited[cipher]
+    if os.environ.get('KEY_SHM'):
+        return read_key_shm(os.environ['KEY_SHM'], cipher)
+    if os.environ.get('KEY_FILE'):
+        return load_or_create_key_file(os.environ['KEY_FILE'], cipher)
+    return KEY_GENERATORS[cipher]()
@@ -0,0 +1,342 @@
+import threading, os
+from collections import OrderedDict
+from Crypto.Random import get_random_bytes
+from modes import DEFAULT_SEGMENT_SIZE, xor_bytes
+
+try:
+    import numpy as np
+except ImportError:  # numpy opsional, engine scalar tetap bisa dipakai
+    np = None
+
+# =======================
+#  Simeck Cipher Section
+# =======================
+# Parameter resmi Simeck 2n/mn: (block_size, key_size) -> (round, urutan z)
+# Bit ke-i dari z (mulai LSB) adalah konstanta round ke-i key schedule.
+SIMECK_PARAMS = {
+    (32, 64): (32, 0x9A42BB1F),
+    (48, 96): (36, 0x9A42BB1F),
+    (64, 128): (44, 0x938BCA3083F),
+}
+
+class Simeck:
+    # Implementasi generik (semua parameter set), dipakai sebagai referensi
+    def __init__(self, block_size, key_size, key):
+        if (block_size, key_size) not in SIMECK_PARAMS:
+            raise ValueError(f"Parameter Simeck tidak didukung: {block_size}/{key_size}")
+        self.block_size = block_size
+        self.key_size = key_size
+        self.round_keys = self.key_schedule(key)
+
+    @classmethod
+    def from_round_keys(cls, block_size, key_size, round_keys):
+        # Pakai key schedule yang sudah diekspansi (mis. dikirim ke worker proses)
+        simeck = cls.__new__(cls)
+        simeck.block_size = block_size
+        simeck.key_size = key_size
+        simeck.round_keys = list(round_keys)
+        return simeck
+
+    def rol(self, x, r):
+        return ((x << r) | (x >> (self.block_size // 2 - r))) & ((1 << (self.block_size // 2)) - 1)
+
+    def simeck_round(self, l, r, k):
+        # (l, r) -> (r ^ f(l) ^ k, l), f(x) = (x & rol(x, 5)) ^ rol(x, 1)
+        tmp = l
+        l = r ^ (l & self.rol(l, 5)) ^ self.rol(l, 1) ^ k
+        r = tmp
+        return l, r
+
+    def key_schedule(self, master_key):
+        word = self.block_size // 2
+        rounds, z = SIMECK_PARAMS[(self.block_size, self.key_size)]
+        constant = (1 << word) - 4
+        # k[0] = word paling bawah (k0), lalu t0, t1, t2
+        k = [(master_key >> (word * i)) & ((1 << word) - 1) for i in range(self.key_size // word)]
+        round_keys = []
+        for i in range(rounds):
+            round_keys.append(k[0])
+            k[1], k[0] = self.simeck_round(k[1], k[0], constant | ((z >> i) & 1))
+            k.append(k.pop(1))
+        return round_keys
+
+    def encrypt(self, block):
+        word = self.block_size // 2
+        l = (block >> word) & ((1 << word) - 1)
+        r = block & ((1 << word) - 1)
+        for k in self.round_keys:
+            l, r = self.simeck_round(l, r, k)
+        return (l << word) | r
+
+# =======================
+#  Specialized Engines
+# =======================
+# Satu kelas per parameter set: rotasi dan mask ditulis sebagai konstanta,
+# dan dua round dikerjakan per iterasi tanpa tukar l/r:
+#   r ^= f(l) ^ k1   (round ganjil)
+#   l ^= f(r) ^ k2   (round genap)
+# Round key sudah dipasangkan (k1, k2) saat key schedule.
+class _SimeckFixed:
+    BLOCK_SIZE = KEY_SIZE = None
+
+    def __init__(self, key):
+        self.round_keys = Simeck(self.BLOCK_SIZE, self.KEY_SIZE, key).round_keys
+        self._pairs = tuple(zip(self.round_keys[0::2], self.round_keys[1::2]))
+
+    @classmethod
+    def from_round_keys(cls, round_keys):
+        simeck = cls.__new__(cls)
+        simeck.round_keys = list(round_keys)
+        simeck._pairs = tuple(zip(simeck.round_keys[0::2], simeck.round_keys[1::2]))
+        return simeck
+
+    @property
+    def block_size(self):
+        return self.BLOCK_SIZE
+
+    @property
+    def key_size(self):
+        return self.KEY_SIZE
+
+class Simeck32_64(_SimeckFixed):
+    BLOCK_SIZE, KEY_SIZE = 32, 64
+
+    def encrypt(self, block):
+        l = block >> 16
+        r = block & 0xFFFF
+        for k1, k2 in self._pairs:
+            r ^= (l & ((l << 5) | (l >> 11))) ^ (((l << 1) | (l >> 15)) & 0xFFFF) ^ k1
+            l ^= (r & ((r << 5) | (r >> 11))) ^ (((r << 1) | (r >> 15)) & 0xFFFF) ^ k2
+        return (l << 16) | r
+
+class Simeck48_96(_SimeckFixed):
+    BLOCK_SIZE, KEY_SIZE = 48, 96
+
+    def encrypt(self, block):
+        l = block >> 24
+        r = block & 0xFFFFFF
+        for k1, k2 in self._pairs:
+            r ^= (l & ((l << 5) | (l >> 19))) ^ (((l << 1) | (l >> 23)) & 0xFFFFFF) ^ k1
+            l ^= (r & ((r << 5) | (r >> 19))) ^ (((r << 1) | (r >> 23)) & 0xFFFFFF) ^ k2
+        return (l << 24) | r
+
+class Simeck64_128(_SimeckFixed):
+    BLOCK_SIZE, KEY_SIZE = 64, 128
+
+    def encrypt(self, block):
+        l = block >> 32
+        r = block & 0xFFFFFFFF
+        for k1, k2 in self._pairs:
+            r ^= (l & ((l << 5) | (l >> 27))) ^ (((l << 1) | (l >> 31)) & 0xFFFFFFFF) ^ k1
+            l ^= (r & ((r << 5) | (r >> 27))) ^ (((r << 1) | (r >> 31)) & 0xFFFFFFFF) ^ k2
+        return (l << 32) | r
+
+SIMECK_VARIANTS = {(c.BLOCK_SIZE, c.KEY_SIZE): c for c in (Simeck32_64, Simeck48_96, Simeck64_128)}
+
+# Test vector resmi (key, plaintext, ciphertext) per parameter set
+SIMECK_TEST_VECTORS = {
+    (32, 64): (0x1918111009080100, 0x65656877, 0x770d2c76),
+    (48, 96): (0x1a19181211100a0908020100, 0x72696320646e, 0xf3cf25e33b36),
+    (64, 128): (0x1b1a1918131211100b0a090803020100, 0x656b696c20646e75, 0x45ce69025f7ab7ed),
+}
+
+def new_simeck(block_size, key_size, key):
+    return SIMECK_VARIANTS[(block_size, key_size)](key)
+
+# Cache key schedule: key tetap selama sesi, jadi ekspansi key schedule
+# cukup dilakukan sekali per (key, block_size, key_size).
+class KeyScheduleCache:
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, block_size=64, key_size=128):
+        params = (key, block_size, key_size)
+        with self._lock:
+            simeck = self._entries.get(params)
+            if simeck is not None:
+                self._entries.move_to_end(params)
+                self.hits += 1
+                return simeck
+            self.misses += 1
+
+        # Ekspansi di luar lock agar thread lain tidak ikut menunggu
+        simeck = new_simeck(block_size, key_size, key)
+        with self._lock:
+            self._entries[params] = simeck
+            self._entries.move_to_end(params)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return simeck
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+simeck_cache = KeyScheduleCache(int(os.environ.get('KEY_CACHE_SIZE', 16)))
+
+def generate_simeck_key_iv():
+    key = int.from_bytes(get_random_bytes(16), 'big')  # 128-bit key
+    iv = get_random_bytes(8)  # 64-bit IV
+    return key, iv
+
+
+# =======================
+#  Batch Engine (NumPy)
+# =======================
+# Semua blok diproses sekaligus: semua round dijalankan pada array uint32
+# (separuh kiri/kanan), hasilnya bit-identik dengan Simeck64_128.encrypt.
+class SimeckBatch:
+    def __init__(self, simeck):
+        if np is None:
+            raise RuntimeError("SimeckBatch membutuhkan numpy")
+        if simeck.block_size != 64:
+            raise ValueError("SimeckBatch hanya mendukung blok 64-bit")
+        self.simeck = simeck
+        self.round_keys = [np.uint32(k) for k in simeck.round_keys]
+
+    def encrypt(self, blocks):
+        blocks = np.asarray(blocks, dtype=np.uint64)
+        l = (blocks >> np.uint64(32)).astype(np.uint32)
+        r = blocks.astype(np.uint32)  # ambil 32 bit bawah
+        a = np.empty_like(r)
+        b = np.empty_like(r)
+
+        for k in self.round_keys:
+            # a = (l & rol(l, 5)) ^ rol(l, 1)
+            np.left_shift(l, 5, out=a)
+            np.right_shift(l, 27, out=b)
+            a |= b
+            a &= l
+            np.left_shift(l, 1, out=b)
+            a ^= b
+            np.right_shift(l, 31, out=b)
+            a ^= b
+            a ^= r
+            a ^= k
+            # (l, r) = (r ^ f(l) ^ k, l), buffer lama dipakai ulang
+            l, r, a = a, l, r
+
+        out = l.astype(np.uint64) << np.uint64(32)
+        out |= r
+        return out
+
+    def keystream(self, counter: int, nblocks: int) -> bytes:
+        # Blok counter berurutan: counter, counter+1, ... (mod 2^64)
+        counters = np.arange(nblocks, dtype=np.uint64)
+        counters += np.uint64(counter & 0xFFFFFFFFFFFFFFFF)
+        return self.encrypt(counters).astype('>u8').tobytes()
+
+    def cfb_decrypt(self, ciphertext: bytes, iv: bytes, segment_size=DEFAULT_SEGMENT_SIZE) -> bytes:
+        # Input register CFB tiap segmen = 8 byte terakhir dari iv||ciphertext
+        # sebelum segmen itu, jadi semua keystream bisa dihitung paralel.
+        seg_bytes = segment_size // 8
+        n = len(ciphertext)
+        if n == 0:
+            return b''
+        stream = np.frombuffer(iv + ciphertext, dtype=np.uint8)
+        offsets = np.arange(0, n, seg_bytes)
+        inputs = np.zeros(len(offsets), dtype=np.uint64)
+        for i in range(8):
+            inputs <<= np.uint64(8)
+            inputs |= stream[offsets + i]
+
+        keystream = self.encrypt(inputs).astype('>u8').view(np.uint8).reshape(-1, 8)
+        keystream = keystream[:, :seg_bytes].ravel()[:n]
+        return (np.frombuffer(ciphertext, dtype=np.uint8) ^ keystream).tobytes()
+
+# =======================
+#  SWAR Engine (tanpa NumPy)
+# =======================
+# N blok disusun berdampingan dalam satu int Python: blok i menempati
+# lane 64 bit (susunan big-endian sama dengan bytes blok), separuh kiri
+# di bit 32..63 dan kanan di bit 0..31. L dan R masing-masing berisi 32 bit
+# aktif + 32 bit guard kosong per lane, jadi rotasi cukup satu mask:
+#   rol(X, s) = ((X << s) | (X >> (32 - s))) & MASK
+# dan L & rol(L, 5) otomatis bersih karena guard L nol. Tiap operasi
+# XOR/AND/shift berjalan di C atas semua lane sekaligus.
+class SimeckSWAR:
+    def __init__(self, simeck, max_cached=4):
+        if simeck.block_size != 64:
+            raise ValueError("SimeckSWAR hanya mendukung blok 64-bit")
+        self.round_keys = list(simeck.round_keys)
+        self.max_cached = max_cached
+        # nlanes -> (rep, mask, ramp, round key direplikasi per lane)
+        self._lanes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lane_constants(self, nlanes):
+        with self._lock:
+            constants = self._lanes.get(nlanes)
+            if constants is not None:
+                self._lanes.move_to_end(nlanes)
+                return constants
+        rep = int.from_bytes(b'\x00\x00\x00\x00\x00\x00\x00\x01' * nlanes, 'big')
+        ramp = int.from_bytes(b''.join(i.to_bytes(8, 'big') for i in range(nlanes)), 'big')
+        keys = [k * rep for k in self.round_keys]
+        constants = (rep, 0xFFFFFFFF * rep, ramp, tuple(zip(keys[0::2], keys[1::2])))
+        with self._lock:
+            self._lanes[nlanes] = constants
+            while len(self._lanes) > self.max_cached:
+                self._lanes.popitem(last=False)
+        return constants
+
+    def encrypt_packed(self, blocks: int, nlanes: int) -> int:
+        _, mask, _, pairs = self._lane_constants(nlanes)
+        l = (blocks >> 32) & mask
+        r = blocks & mask
+        for k1, k2 in pairs:
+            r ^= (l & ((l << 5) | (l >> 27))) ^ (((l << 1) | (l >> 31)) & mask) ^ k1
+            l ^= (r & ((r << 5) | (r >> 27))) ^ (((r << 1) | (r >> 31)) & mask) ^ k2
+        return (l << 32) | r
+
+    def encrypt_blocks(self, data: bytes) -> bytes:
+        # data = gabungan blok 8 byte big-endian
+        nlanes = len(data) // 8
+        if nlanes == 0:
+            return b''
+        return self.encrypt_packed(int.from_bytes(data, 'big'), nlanes).to_bytes(8 * nlanes, 'big')
+
+    def keystream(self, counter: int, nblocks: int) -> bytes:
+        # Blok counter berurutan: counter, counter+1, ... (mod 2^64)
+        if nblocks == 0:
+            return b''
+        counter &= 0xFFFFFFFFFFFFFFFF
+        if counter + nblocks > 1 << 64:
+            data = b''.join(((counter + i) & 0xFFFFFFFFFFFFFFFF).to_bytes(8, 'big') for i in range(nblocks))
+            return self.encrypt_blocks(data)
+        rep, _, ramp, _ = self._lane_constants(nblocks)
+        # counter di setiap lane + 0, 1, 2, ... tanpa carry antar lane
+        blocks = counter * rep + ramp
+        return self.encrypt_packed(blocks, nblocks).to_bytes(8 * nblocks, 'big')
+
+    def cfb_decrypt(self, ciphertext: bytes, iv: bytes, segment_size=DEFAULT_SEGMENT_SIZE) -> bytes:
+        # Sama seperti SimeckBatch.cfb_decrypt: input tiap segmen sudah diketahui
+        seg_bytes = segment_size // 8
+        n = len(ciphertext)
+        if n == 0:
+            return b''
+        if seg_bytes == 8:
+            inputs = iv + ciphertext[:(n - 1) // 8 * 8]
+        else:
+            stream = iv + ciphertext
+            inputs = b''.join(stream[i:i + 8] for i in range(0, n, seg_bytes))
+        keystream = self.encrypt_blocks(inputs)
+        if seg_bytes == 1:
+            keystream = keystream[::8]
+        return xor_bytes(ciphertext, keystream)
@@ -0,0 +1,116 @@
+from functools import lru_cache
+from Crypto.Random import get_random_bytes
+
+# =======================
+#  SKINNY-64 Section
+# =======================
+# SKINNY-64/64, 64/128 dan 64/192 (TK1/TK2/TK3). State 64-bit disimpan
+# sebagai int, sel 0 = nibble paling atas, baris 0 = 16 bit paling atas.
+SBOX4 = [0xC, 0x6, 0x9, 0x0, 0x1, 0xA, 0x2, 0xB, 0x3, 0x8, 0x5, 0xD, 0x4, 0xE, 0x7, 0xF]
+SBOX8 = [(SBOX4[v >> 4] << 4) | SBOX4[v & 0xF] for v in range(256)]
+
+# Permutasi tweakey PT dan jumlah round per ukuran key (byte)
+TWEAKEY_PERM = [9, 15, 8, 13, 10, 14, 12, 11, 0, 1, 2, 3, 4, 5, 6, 7]
+ROUNDS = {8: 32, 16: 36, 24: 40}
+
+def _shift_rows(x: int) -> int:
+    # Baris i diputar ke kanan sebanyak i nibble
+    r0 = (x >> 48) & 0xFFFF
+    r1 = (x >> 32) & 0xFFFF
+    r2 = (x >> 16) & 0xFFFF
+    r3 = x & 0xFFFF
+    r1 = ((r1 >> 4) | (r1 << 12)) & 0xFFFF
+    r2 = ((r2 >> 8) | (r2 << 8)) & 0xFFFF
+    r3 = ((r3 >> 12) | (r3 << 4)) & 0xFFFF
+    return (r0 << 48) | (r1 << 32) | (r2 << 16) | r3
+
+def _mix_columns(x: int) -> int:
+    r0 = (x >> 48) & 0xFFFF
+    r1 = (x >> 32) & 0xFFFF
+    r2 = (x >> 16) & 0xFFFF
+    r3 = x & 0xFFFF
+    r1 ^= r2
+    r2 ^= r0
+    r3 ^= r2
+    return (r3 << 48) | (r0 << 32) | (r1 << 16) | r2
+
+def _linear(x: int) -> int:
+    return _mix_columns(_shift_rows(x))
+
+# Tabel T: SubCells + ShiftRows + MixColumns untuk tiap posisi byte.
+# Karena SR dan MC linear, satu round = 8 lookup + XOR dengan round key
+# yang sudah dilewatkan lewat SR/MC.
+T_TABLES = [[_linear(SBOX8[v] << (56 - 8 * j)) for v in range(256)] for j in range(8)]
+
+def _lfsr_tk2(x: int) -> int:
+    return ((x << 1) & 0xE) | (((x >> 3) ^ (x >> 2)) & 1)
+
+def _lfsr_tk3(x: int) -> int:
+    return (x >> 1) | (((x ^ (x >> 3)) & 1) << 3)
+
+def _nibbles(block: bytes) -> list:
+    return [(b >> s) & 0xF for b in block for s in (4, 0)]
+
+@lru_cache(maxsize=16)
+def tweakey_schedule(key: bytes) -> tuple:
+    if len(key) not in ROUNDS:
+        raise ValueError(f"Ukuran key SKINNY-64 tidak didukung: {len(key) * 8} bit")
+    tks = [_nibbles(key[i:i + 8]) for i in range(0, len(key), 8)]
+    lfsrs = [None, _lfsr_tk2, _lfsr_tk3]
+    rc = 0
+    round_keys = []
+
+    for _ in range(ROUNDS[len(key)]):
+        rc = ((rc << 1) & 0x3F) | (((rc >> 5) ^ (rc >> 4) ^ 1) & 1)
+        rtk = 0
+        for i in range(8):
+            cell = 0
+            for tk in tks:
+                cell ^= tk[i]
+            rtk = (rtk << 4) | cell
+        # Konstanta round: c0 di sel 0, c1 di sel 4, c2 = 0x2 di sel 8
+        rk = (rtk << 32) ^ ((rc & 0xF) << 60) ^ ((rc >> 4) << 44) ^ (0x2 << 28)
+        round_keys.append(_linear(rk))
+
+        for n, tk in enumerate(tks):
+            tk[:] = [tk[p] for p in TWEAKEY_PERM]
+            if lfsrs[n] is not None:
+                tk[:8] = [lfsrs[n](c) for c in tk[:8]]
+
+    return tuple(round_keys)
+
+class Skinny64:
+    def __init__(self, key: bytes):
+        self.key = key
+        self.rounds = ROUNDS.get(len(key))
+        self.round_keys = tweakey_schedule(bytes(key))
+
+    @classmethod
+    def from_round_keys(cls, round_keys):
+        # Pakai tweakey schedule yang sudah diekspansi (mis. dikirim ke worker proses)
+        skinny = cls.__new__(cls)
+        skinny.key = None
+        skinny.rounds = len(round_keys)
+        skinny.round_keys = tuple(round_keys)
+        return skinny
+
+    def encrypt_block(self, block: int) -> int:
+        t0, t1, t2, t3, t4, t5, t6, t7 = T_TABLES
+        x = block
+        for rk in self.round_keys:
+            x = (t0[x >> 56] ^ t1[(x >> 48) & 0xFF] ^ t2[(x >> 40) & 0xFF] ^ t3[(x >> 32) & 0xFF] ^
+                 t4[(x >> 24) & 0xFF] ^ t5[(x >> 16) & 0xFF] ^ t6[(x >> 8) & 0xFF] ^ t7[x & 0xFF] ^ rk)
+        return x
+
+# Vektor uji dari paper SKINNY (key bits -> key, plaintext, ciphertext);
+# diperiksa oleh benchmark_skinny.py --vectors untuk semua engine SKINNY
+SKINNY_TEST_VECTORS = {
+    64: (bytes.fromhex('f5269826fc681238'), 0x06034f957724d19d, 0xbb39dfb2429b8ac7),
+    128: (bytes.fromhex('9eb93640d088da6376a39d1c8bea71e1'), 0xcf16cfe8fd0f98aa, 0x6ceda1f43de92b9e),
+    192: (bytes.fromhex('ed00c85b120d68618753e24bfd908f60b2dbb41b422dfcd0'), 0x530c61d35e8663c3, 0xdd2cf1a8f330303c),
+}
+
+def generate_skinny_key_iv():
+    key = get_random_bytes(16)  # 128-bit key (SKINNY-64/128)
+    iv = get_random_bytes(8)    # 64-bit IV
+    return key, iv
@@ -0,0 +1,231 @@
+import os, threading, queue, time
+from metrics import REGISTRY, SIZE_BUCKETS
+from profiling import NULL_TRACE
+
+try:
+    import resource
+except ImportError:  # bukan Unix
+    resource = None
+
+# =======================
+#  Decrypt Worker Section
+# =======================
+# on_message paho hanya memasukkan payload mentah ke antrean terbatas;
+# dekripsi dan print dikerjakan worker thread, jadi thread jaringan paho
+# (keepalive, baca socket, ACK) tidak ikut tertahan saat burst.
+#   policy = block       tunggu slot kosong maksimal block_timeout, lalu buang
+#            drop        langsung buang pesan baru saat antrean penuh
+#            drop_oldest buang pesan tertua untuk memberi tempat pesan baru
+POLICIES = ('block', 'drop', 'drop_oldest')
+OTHER_SHARD = 'other'  # shard baru setelah max_shards tercapai
+
+DECRYPT_FAILURES = REGISTRY.counter('subscriber_decrypt_failures_total', "Pesan yang gagal didekripsi")
+QUEUE_WAIT_SECONDS = REGISTRY.histogram('subscriber_queue_wait_seconds', "Waktu pesan menunggu di antrean dekripsi")
+RECEIVED_BYTES = REGISTRY.histogram('subscriber_message_bytes', "Ukuran payload yang diterima", SIZE_BUCKETS)
+
+def process_rss():
+    # Resident memory proses saat ini (Linux: /proc/self/statm); di OS lain
+    # hanya puncaknya yang tersedia lewat ru_maxrss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        if resource is None:
+            return None
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def topic_shard(topic: str, depth: int) -> str:
+    # Shard = depth level pertama topik, mis. suhu/<site>/<device> dengan depth 2 -> suhu/<site>
+    return '/'.join(topic.split('/')[:depth])
+
+class DecryptWorkerPool:
+    def __init__(self, decrypt_fn, handle_fn, workers=2, queue_size=1000, policy='block', block_timeout=1.0,
+                 profiler=None, shard_fn=None, max_shards=64):
+        if policy not in POLICIES:
+            raise ValueError(f"Policy antrean tidak dikenal: {policy} (pilih: {', '.join(POLICIES)})")
+        self.decrypt_fn = decrypt_fn
+        self.handle_fn = handle_fn
+        self.workers = workers
+        self.policy = policy
+        self.block_timeout = block_timeout
+        # decrypt_fn(topic, payload); dengan profiler, pesan yang disampel memanggil
+        # decrypt_fn(topic, payload, trace)
+        self.profiler = profiler
+        # shard_fn(topic) -> nama shard; throughput per shard ada di stats() dan /metrics.
+        # Nama shard berasal dari topik (site kiriman client), jadi dibatasi max_shards;
+        # shard berikutnya digabung ke OTHER_SHARD
+        self.shard_fn = shard_fn
+        self.max_shards = max_shards
+        self.shards = {}  # shard -> [processed, failures, bytes]
+        self.queue = queue.Queue(queue_size)
+        self.enqueued = 0
+        self.processed = 0
+        self.failures = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._busy = 0.0
+        self._started_at = None
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def start(self):
+        if self._threads:
+            return self
+        self._stopping.clear()
+        self._started_at = time.perf_counter()
+        REGISTRY.gauge_fn('subscriber_queue_depth', "Pesan di antrean dekripsi", self.queue.qsize)
+        REGISTRY.counter_fn('subscriber_dropped_total', "Pesan dibuang karena antrean penuh", lambda: self.dropped)
+        if self.shard_fn is not None:
+            REGISTRY.counter_fn('subscriber_shard_messages_total', "Pesan yang diproses per shard topik",
+                                lambda: {shard: counts[0] for shard, counts in list(self.shards.items())},
+                                label_name='shard')
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"decrypt-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        # Antrean dikosongkan dulu (pesan sisa dihitung dropped) supaya sentinel
+        # None tidak terblokir; jika on_message mengisinya lagi, worker tetap
+        # berhenti lewat _stopping setelah get() berikutnya
+        timeout = self.block_timeout if timeout is None else timeout
+        self._stopping.set()
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+            self._drop()
+        for _ in self._threads:
+            try:
+                self.queue.put(None, timeout=timeout)
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, topic, payload) -> bool:
+        # Dipanggil dari on_message: tidak boleh ada kerja berat di sini
+        RECEIVED_BYTES.observe(len(payload))
+        if self._stopping.is_set():
+            return self._drop()
+        item = (time.perf_counter(), topic, payload)
+        try:
+            if self.policy == 'block':
+                self.queue.put(item, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(item)
+        except queue.Full:
+            if self.policy != 'drop_oldest':
+                return self._drop()
+            try:
+                self.queue.get_nowait()
+                self._drop()
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                return self._drop()
+        with self._lock:
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, self.queue.qsize())
+        return True
+
+    def _drop(self) -> bool:
+        with self._lock:
+            self.dropped += 1
+        return False
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None or self._stopping.is_set():
+                return
+            enqueued_at, topic, payload = item
+            start = time.perf_counter()
+            QUEUE_WAIT_SECONDS.observe(start - enqueued_at)
+            trace = self.profiler.sample('message') if self.profiler is not None else NULL_TRACE
+            try:
+                if trace:
+                    trace.add('queue', start - enqueued_at)
+                    decrypted = self.decrypt_fn(topic, payload, trace)
+                    self.handle_fn(topic, decrypted)
+                    trace.lap('handle')
+                    trace.finish()
+                else:
+                    self.handle_fn(topic, self.decrypt_fn(topic, payload))
+                failed = False
+            except Exception as e:
+                print(f"⚠️ Gagal mendekripsi: {e}")
+                DECRYPT_FAILURES.inc()
+                failed = True
+            done = time.perf_counter()
+            shard = self.shard_fn(topic) if self.shard_fn is not None else None
+            with self._lock:
+                self.processed += 1
+                self.failures += failed
+                if shard is not None:
+                    counts = self.shards.get(shard)
+                    if counts is None and len(self.shards) >= self.max_shards:
+                        counts = self.shards.get(OTHER_SHARD)
+                        shard = OTHER_SHARD
+                    if counts is None:
+                        counts = self.shards[shard] = [0, 0, 0]
+                    counts[0] += 1
+                    counts[1] += failed
+                    counts[2] += len(payload)
+                wait = start - enqueued_at
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+                self._busy += done - start
+
+    def stats(self):
+        with self._lock:
+            elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+            return {
+                "workers": self.workers,
+                "policy": self.policy,
+                "queue_depth": self.queue.qsize(),
+                "queue_max_depth": self.max_depth,
+                "queue_size": self.queue.maxsize,
+                "enqueued": self.enqueued,
+                "processed": self.processed,
+                "failures": self.failures,
+                "dropped": self.dropped,
+                "wait_avg_ms": self._wait_total / self.processed * 1e3 if self.processed else 0.0,
+                "wait_max_ms": self._wait_max * 1e3,
+                "utilisation": self._busy / (elapsed * self.workers) if elapsed else 0.0,
+                "rss_bytes": process_rss(),
+                "msg_per_sec": self.processed / elapsed if elapsed else 0.0,
+                "shards": {
+                    shard: {"processed": processed, "failures": failures, "bytes": size,
+                            "msg_per_sec": processed / elapsed if elapsed else 0.0}
+                    for shard, (processed, failures, size) in sorted(self.shards.items())
+                },
+            }
+
+    def report_every(self, seconds: float, label: str):
+        # Cetak throughput per interval (total dan per shard) dari thread daemon;
+        # interval tanpa pesan tidak dicetak
+        def run():
+            last_total, last = self.processed, {}
+            while True:
+                time.sleep(seconds)
+                with self._lock:
+                    total, current = self.processed, {shard: counts[0] for shard, counts in self.shards.items()}
+                if total == last_total:
+                    continue
+                shards = ', '.join(f"{shard} {(count - last.get(shard, 0)) / seconds:.1f}/s"
+                                   for shard, count in sorted(current.items()) if count != last.get(shard, 0))
+                print(f"📊 {label}: {(total - last_total) / seconds:.1f} pesan/s" + (f" ({shards})" if shards else ""))
+                last_total, last = total, current
+
+        thread = threading.Thread(target=run, name="subscriber-report", daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,37 @@
+from Crypto.Cipher import DES3
+from Crypto.Random import get_random_bytes
+from modes import DEFAULT_SEGMENT_SIZE
+
+# =======================
+#  3DES Utility Section
+# =======================
+def generate_key_iv():
+    key = DES3.adjust_key_parity(get_random_bytes(24))  # 3DES needs 24-byte key
+    iv = get_random_bytes(8)  # 64-bit IV
+    return key, iv
+
+# Stream 3DES-CFB dengan antarmuka update()/finalize() yang sama seperti
+# CFBStream; output ditulis langsung oleh PyCryptodome ke buffer pemanggil.
+class TripleDESStream:
+    def __init__(self, key: bytes, iv: bytes, segment_size=DEFAULT_SEGMENT_SIZE, decrypt=False):
+        self.segment_size = segment_size
+        self.decrypting = decrypt
+        self._cipher = DES3.new(key, DES3.MODE_CFB, iv, segment_size=segment_size)
+        self._process = self._cipher.decrypt if decrypt else self._cipher.encrypt
+        self._finalized = False
+
+    def update(self, chunk, out=None):
+        if self._finalized:
+            raise ValueError("Stream sudah di-finalize")
+        if out is None:
+            return self._process(chunk)
+        n = len(chunk)
+        dst = memoryview(out).cast('B')
+        if len(dst) < n:
+            raise ValueError("Buffer output terlalu kecil")
+        self._process(chunk, output=dst[:n])
+        return n
+
+    def finalize(self) -> bytes:
+        self._finalized = True
+        return b''
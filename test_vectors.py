@@ -0,0 +1,62 @@
+import pytest
+from backends import ENGINES
+from simeck import np, SIMECK_TEST_VECTORS, SIMECK_VARIANTS, Simeck, SimeckBatch, SimeckSWAR
+from skinny import SKINNY_TEST_VECTORS, Skinny64
+
+# =======================
+#  Simeck Vector Section
+# =======================
+# Vektor resmi tiap parameter set: implementasi generik (referensi),
+# kelas khusus per parameter set, lalu engine 64/128: NumPy, SWAR dan
+# semua engine yang terdaftar di backends.
+@pytest.mark.parametrize('params', sorted(SIMECK_TEST_VECTORS))
+def test_simeck_generic_vector(params):
+    key, pt, ct = SIMECK_TEST_VECTORS[params]
+    assert Simeck(*params, key).encrypt(pt) == ct
+
+@pytest.mark.parametrize('params', sorted(SIMECK_TEST_VECTORS))
+def test_simeck_specialized_vector(params):
+    key, pt, ct = SIMECK_TEST_VECTORS[params]
+    simeck = SIMECK_VARIANTS[params](key)
+    assert simeck.encrypt(pt) == ct
+    assert SIMECK_VARIANTS[params].from_round_keys(simeck.round_keys).encrypt(pt) == ct
+
+@pytest.mark.skipif(np is None, reason="engine batch membutuhkan numpy")
+def test_simeck_batch_vector():
+    key, pt, ct = SIMECK_TEST_VECTORS[(64, 128)]
+    out = SimeckBatch(SIMECK_VARIANTS[(64, 128)](key)).encrypt([pt, pt])
+    assert [int(block) for block in out] == [ct, ct]
+
+def test_simeck_swar_vector():
+    key, pt, ct = SIMECK_TEST_VECTORS[(64, 128)]
+    swar = SimeckSWAR(SIMECK_VARIANTS[(64, 128)](key))
+    assert swar.encrypt_blocks(pt.to_bytes(8, 'big') * 3) == ct.to_bytes(8, 'big') * 3
+
+@pytest.mark.parametrize('engine', sorted(ENGINES['simeck']))
+def test_simeck_engine_vector(engine):
+    key, pt, ct = SIMECK_TEST_VECTORS[(64, 128)]
+    cls = ENGINES['simeck'][engine]
+    instance = cls(key)
+    assert instance.encrypt_block(pt) == ct
+    assert cls.from_round_keys(instance.round_keys).encrypt_block(pt) == ct
+
+# =======================
+#  SKINNY Vector Section
+# =======================
+# Vektor uji paper SKINNY-64 diperiksa di setiap engine terdaftar, juga
+# lewat key schedule yang dikirim ke worker proses (from_round_keys).
+@pytest.mark.parametrize('bits', sorted(SKINNY_TEST_VECTORS))
+def test_skinny64_vector(bits):
+    key, pt, ct = SKINNY_TEST_VECTORS[bits]
+    skinny = Skinny64(key)
+    assert skinny.encrypt_block(pt) == ct
+    assert Skinny64.from_round_keys(skinny.round_keys).encrypt_block(pt) == ct
+
+@pytest.mark.parametrize('engine', sorted(ENGINES['skinny']))
+@pytest.mark.parametrize('bits', sorted(SKINNY_TEST_VECTORS))
+def test_skinny_engine_vector(engine, bits):
+    key, pt, ct = SKINNY_TEST_VECTORS[bits]
+    cls = ENGINES['skinny'][engine]
+    instance = cls(key)
+    assert instance.encrypt_block(pt) == ct
+    assert cls.from_round_keys(instance.round_keys).encrypt_block(pt) == ct